@@ -1,10 +1,14 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from typing import Dict, Optional, Set, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from . import models, schemas
 from .database import get_db
 
@@ -13,18 +17,106 @@ SECRET_KEY = "your-secret-key-change-in-production"  # Change in production!
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Principal cache settings (set via environment variables)
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))  # seconds
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/creators/login")
 
+logger = logging.getLogger(__name__)
+
+
+class PrincipalCache:
+    """Short-lived cache from a verified token to a snapshot of its creator
+
+    Entries expire after PRINCIPAL_CACHE_TTL or when the token itself
+    expires, whichever comes first. Handlers that change a creator's
+    identity or verification call invalidate() so no stale principal is
+    served afterwards.
+    """
+
+    def __init__(self, maxsize: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, models.Creator]]" = OrderedDict()
+        self._tokens_by_creator: Dict[int, Set[str]] = {}
+
+    def get(self, token: str) -> Optional[models.Creator]:
+        with self._lock:
+            item = self._entries.get(token)
+            if item is None:
+                return None
+            expires_at, creator = item
+            if expires_at < time.time():
+                self._remove(token)
+                return None
+            self._entries.move_to_end(token)
+            return creator
+
+    def set(self, token: str, creator: models.Creator, token_expires_at: float):
+        # Detached copy: safe to hand to any request without a session
+        snapshot = models.Creator(
+            **{column.key: getattr(creator, column.key) for column in models.Creator.__table__.columns}
+        )
+        with self._lock:
+            self._remove(token)
+            self._entries[token] = (min(time.time() + self.ttl, token_expires_at), snapshot)
+            self._tokens_by_creator.setdefault(snapshot.id, set()).add(token)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, creator_id: int):
+        """Drop every cached token of a creator"""
+        with self._lock:
+            for token in list(self._tokens_by_creator.get(creator_id, ())):
+                self._remove(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_creator.clear()
+
+    def _remove(self, token: str):
+        item = self._entries.pop(token, None)
+        if item is not None:
+            tokens = self._tokens_by_creator.get(item[1].id)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._tokens_by_creator[item[1].id]
+
+
+principal_cache = PrincipalCache()
+
+
+@lru_cache(maxsize=None)
+def jwt_codec():
+    """python-jose's jwt module and JWTError, imported on first use
+
+    Its cryptography backend also loads bcrypt, a large share of the app's
+    import time; the lifespan warms it before the first request.
+    """
+    from jose import JWTError, jwt
+    return jwt, JWTError
+
+
+@lru_cache(maxsize=None)
+def password_context():
+    """bcrypt context, built on first use since logins go through Google"""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
-    return pwd_context.hash(password)
+    return password_context().hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -35,12 +127,13 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
+    jwt, _ = jwt_codec()
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def get_current_creator(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+async def get_current_creator(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
 ) -> models.Creator:
     """Get current authenticated creator from JWT token"""
     credentials_exception = HTTPException(
@@ -48,48 +141,40 @@ def get_current_creator(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    cached = principal_cache.get(token)
+    if cached is not None:
+        return cached
+    
+    jwt, JWTError = jwt_codec()
     try:
-        print(f"[AUTH DEBUG] Token received: {token[:20]}...")
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        print(f"[AUTH DEBUG] Token payload: {payload}")
         creator_id = payload.get("sub")
-        print(f"[AUTH DEBUG] Creator ID from token: {creator_id}, type: {type(creator_id)}")
         
         if creator_id is None:
-            print("[AUTH DEBUG] Creator ID is None")
+            logger.debug("Rejected token: no subject")
             raise credentials_exception
         
         # JWT returns 'sub' as string, convert to integer for database query
         try:
             creator_id = int(creator_id)
-            print(f"[AUTH DEBUG] Creator ID converted to int: {creator_id}")
-        except (ValueError, TypeError) as e:
-            print(f"[AUTH DEBUG] Failed to convert creator_id to int: {e}")
+        except (ValueError, TypeError):
+            logger.debug("Rejected token: non-integer subject %r", creator_id)
             raise credentials_exception
     except JWTError as e:
-        print(f"[AUTH DEBUG] JWT Error: {e}")
-        raise credentials_exception
-    except Exception as e:
-        print(f"[AUTH DEBUG] Unexpected error: {e}")
+        logger.debug("Rejected token: %s", e)
         raise credentials_exception
     
     # Check if creator exists in database
-    creator = db.query(models.Creator).filter(models.Creator.id == creator_id).first()
-    print(f"[AUTH DEBUG] Creator found in DB: {creator is not None}")
-    if creator:
-        print(f"[AUTH DEBUG] Creator details: id={creator.id}, email={creator.email}, name={creator.name}")
-    else:
-        print(f"[AUTH DEBUG] No creator found with ID: {creator_id}")
-        # List all creators in DB for debugging
-        all_creators = db.query(models.Creator).all()
-        print(f"[AUTH DEBUG] All creators in DB: {[(c.id, c.email) for c in all_creators]}")
-    
+    creator = await db.get(models.Creator, creator_id)
     if creator is None:
+        logger.info("Rejected token: unknown creator_id=%s", creator_id)
         raise credentials_exception
+    
+    principal_cache.set(token, creator, float(payload.get("exp", 0)))
     return creator
 
 
-def get_current_verified_creator(
+async def get_current_verified_creator(
     current_creator: models.Creator = Depends(get_current_creator),
 ) -> models.Creator:
     """Get current creator and verify they are verified"""
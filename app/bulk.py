@@ -0,0 +1,152 @@
+import csv
+import io
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import Row, insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models, schemas
+from .invalidation import POINTS, bus
+from .point_index import point_index
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("json", "ndjson", "csv")
+MAX_BULK_ROWS = 50_000
+CHUNK_SIZE = 1000
+
+MEDIA_TYPES = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "text/csv": "csv",
+}
+
+
+def detect_format(content_type: Optional[str], filename: Optional[str] = None) -> Optional[str]:
+    """Pick an import format from a media type or, failing that, a file extension"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in MEDIA_TYPES:
+        return MEDIA_TYPES[media_type]
+    if filename:
+        extension = filename.rsplit(".", 1)[-1].lower()
+        if extension in FORMATS:
+            return extension
+        if extension == "jsonl":
+            return "ndjson"
+    return None
+
+
+def parse_rows(content: bytes, format: str) -> List[Any]:
+    """Split an upload into raw rows; raises ValueError if it can't be parsed"""
+    text = content.decode("utf-8-sig")
+    if format == "json":
+        rows = json.loads(text)
+        if not isinstance(rows, list):
+            raise ValueError("JSON upload must be an array of points")
+    elif format == "ndjson":
+        rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+    elif format == "csv":
+        # Empty cells mean "not provided"
+        rows = [
+            {key: (value if value != "" else None) for key, value in row.items()}
+            for row in csv.DictReader(io.StringIO(text))
+        ]
+    else:
+        raise ValueError(f"Unsupported format: {format}")
+    if len(rows) > MAX_BULK_ROWS:
+        raise ValueError(f"Too many rows: {len(rows)} (max {MAX_BULK_ROWS})")
+    return rows
+
+
+def validate_rows(rows: List[Any]) -> Tuple[List[Tuple[int, schemas.DonationPointCreate]], List[schemas.BulkRowError]]:
+    """Validate every row, collecting errors instead of stopping at the first"""
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, schemas.DonationPointCreate.model_validate(row)))
+        except ValidationError as e:
+            errors.append(schemas.BulkRowError(
+                row=index,
+                errors=[f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}" for err in e.errors()]
+            ))
+    return valid, errors
+
+
+def _insert_error(error: SQLAlchemyError) -> str:
+    """What a client is told about a row the database rejected; details are only logged"""
+    if isinstance(error, IntegrityError):
+        return "insert failed: the row violates a database constraint"
+    return "insert failed: the database could not store the row"
+
+
+async def _insert(db: AsyncSession, creator_id: int, mappings: List[Dict[str, Any]]) -> List[Row]:
+    """Insert one creator's rows in one executemany and commit"""
+    result = await db.execute(
+        insert(models.DonationPoint)
+        .values(creator_verified=models.creator_verified_of(creator_id))
+        .returning(
+            models.DonationPoint.id,
+            models.DonationPoint.latitude,
+            models.DonationPoint.longitude,
+            models.DonationPoint.status,
+        ),
+        mappings,
+    )
+    inserted = result.all()
+    await db.commit()
+    return inserted
+
+
+async def insert_points(
+    db: AsyncSession,
+    creator_id: int,
+    rows: List[Tuple[int, schemas.DonationPointCreate]],
+    chunk_size: int = CHUNK_SIZE,
+) -> Tuple[List[int], List[schemas.BulkRowError]]:
+    """Insert validated rows with one executemany per chunk
+
+    Each chunk is its own transaction. A chunk the database rejects is rolled
+    back and retried row by row, so only the offending rows are reported and
+    the rest are still stored. The in-memory point index is patched once for
+    the whole batch.
+    """
+    ids, errors, indexed = [], [], []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        mappings: List[Dict[str, Any]] = [
+            {
+                **point.model_dump(),
+                "creator_id": creator_id,
+                "status": models.PointStatus.ONGOING,
+            }
+            for _, point in chunk
+        ]
+        try:
+            inserted = await _insert(db, creator_id, mappings)
+        except SQLAlchemyError:
+            await db.rollback()
+            inserted = []
+            for (index, _), mapping in zip(chunk, mappings):
+                try:
+                    inserted.extend(await _insert(db, creator_id, [mapping]))
+                except SQLAlchemyError as e:
+                    await db.rollback()
+                    logger.warning("Bulk insert of row %d failed: %s", index, e)
+                    errors.append(schemas.BulkRowError(row=index, errors=[_insert_error(e)]))
+        ids.extend(row.id for row in inserted)
+        indexed.extend(tuple(row) for row in inserted)
+
+    point_index.upsert_many(indexed)
+    await bus.publish(POINTS, ids)
+    return ids, errors
+
+
+async def import_points(db: AsyncSession, creator_id: int, raw_rows: List[Any]) -> schemas.BulkImportResult:
+    """Validate and insert raw rows, reporting per-row errors"""
+    valid, errors = validate_rows(raw_rows)
+    ids, insert_errors = await insert_points(db, creator_id, valid)
+    errors = sorted(errors + insert_errors, key=lambda error: error.row)
+    return schemas.BulkImportResult(created=len(ids), ids=ids, errors=errors)
@@ -0,0 +1,203 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+from starlette.datastructures import Headers, MutableHeaders
+
+# Cache settings (set via environment variables)
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))  # seconds
+# Coordinates in cache keys are rounded to this grid (degrees, ~100 m)
+RESPONSE_CACHE_COORD_GRID = float(os.getenv("RESPONSE_CACHE_COORD_GRID", "0.001"))
+
+# GET endpoints whose responses are cached
+CACHEABLE_PATHS = [
+    re.compile(r"^/api/donation-points$"),
+    re.compile(r"^/api/donation-points/\d+$"),
+    re.compile(r"^/api/creators/\d+$"),
+]
+
+COORDINATE_PARAMS = {"lat", "lng", "start_lat", "start_lng", "end_lat", "end_lng"}
+
+
+def _is_json(media_type: str) -> bool:
+    return media_type == "application/json" or media_type.endswith("+json")
+
+
+class CachedResponse(NamedTuple):
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    etag: str
+
+
+class DataVersion:
+    """Counter bumped by every write that can change a cached response"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def bump(self):
+        with self._lock:
+            self.value += 1
+
+
+class ResponseCache:
+    """Bounded LRU of rendered responses with a per-entry TTL
+
+    Keys embed the data version, so a write makes older entries unreachable
+    and the LRU ages them out.
+    """
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, Tuple[float, CachedResponse]]" = OrderedDict()
+
+    def get(self, key: tuple) -> Optional[CachedResponse]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, response = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def set(self, key: tuple, response: CachedResponse):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+data_version = DataVersion()
+response_cache = ResponseCache()
+
+
+def normalize_query(query_string: bytes, grid: float = RESPONSE_CACHE_COORD_GRID) -> str:
+    """Sort query params and snap coordinates to the cache grid"""
+    params = []
+    for name, value in parse_qsl(query_string.decode("latin-1"), keep_blank_values=True):
+        if name in COORDINATE_PARAMS and grid > 0:
+            try:
+                value = f"{round(float(value) / grid) * grid:.6f}"
+            except ValueError:
+                pass
+        params.append((name, value))
+    return urlencode(sorted(params))
+
+
+def make_etag(body: bytes) -> str:
+    """Weak ETag derived from the uncompressed response body
+
+    Weak because GZipMiddleware may compress the body after it is tagged:
+    the identity and gzip encodings are equivalent, not byte-identical.
+    """
+    return 'W/"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _opaque_tag(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match calls for"""
+    if not if_none_match:
+        return False
+    candidates = [_opaque_tag(tag.strip()) for tag in if_none_match.split(",")]
+    return "*" in candidates or _opaque_tag(etag) in candidates
+
+
+class ResponseCacheMiddleware:
+    """Serve cacheable GET endpoints from the response cache
+
+    Successful JSON responses are stored under the path, the normalized query,
+    the Accept header and the data version at request time. Every response
+    carries a weak ETag, and a matching If-None-Match gets a bodyless
+    304 Not Modified.
+    """
+
+    def __init__(self, app, cache: ResponseCache = response_cache, version: DataVersion = data_version):
+        self.app = app
+        self.cache = cache
+        self.version = version
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not any(pattern.match(scope["path"]) for pattern in CACHEABLE_PATHS)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        key = (
+            scope["path"],
+            normalize_query(scope["query_string"]),
+            request_headers.get("accept", ""),
+            self.version.value,
+        )
+        cached = self.cache.get(key)
+        cache_status = "HIT"
+
+        if cached is None:
+            cache_status = "MISS"
+            cached = await self._render(scope, receive, send)
+            if cached is None:
+                return  # Not cacheable; already sent downstream
+            self.cache.set(key, cached)
+
+        headers = MutableHeaders(raw=list(cached.headers))
+        headers["ETag"] = cached.etag
+        headers["Cache-Control"] = "no-cache"
+        headers["X-Cache"] = cache_status
+        if etag_matches(request_headers.get("if-none-match"), cached.etag):
+            del headers["content-length"]
+            del headers["content-type"]
+            await send({"type": "http.response.start", "status": 304, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await send({"type": "http.response.start", "status": cached.status, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": cached.body})
+
+    async def _render(self, scope, receive, send) -> Optional[CachedResponse]:
+        """Run the endpoint, buffering its response if it can be cached"""
+        start = {}
+        chunks = []
+        passthrough = False
+
+        async def capture(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                media_type = Headers(raw=message["headers"]).get("content-type", "").split(";")[0]
+                if message["status"] != 200 or not _is_json(media_type):
+                    passthrough = True
+                    await send(message)
+                start = message
+            elif passthrough:
+                await send(message)
+            else:
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        if passthrough:
+            return None
+
+        body = b"".join(chunks)
+        return CachedResponse(start["status"], list(start["headers"]), body, make_etag(body))
@@ -0,0 +1,19 @@
+from sqlalchemy.sql import column, table
+
+# Change log for delta sync. Triggers append a row, under a new AUTOINCREMENT
+# sequence number, for every insert, update and delete of a donation point and
+# drop the point's previous entry, so the log holds one entry per point ever
+# written and a client that last synced at `seq` only needs entries after it.
+# The table and triggers are created by migration 3.
+CHANGES_TABLE = "point_changes"
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+point_changes = table(
+    CHANGES_TABLE,
+    column("seq"),
+    column("point_id"),
+    column("op"),
+)
+
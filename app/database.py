@@ -1,33 +1,104 @@
-from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 import os
+from contextlib import AsyncExitStack
+from .metrics import instrument_engine
 
-# SQLite database URL
-SQLALCHEMY_DATABASE_URL = "sqlite:///./db.sqlite"
+# Database URL (set via DATABASE_URL environment variable); must use an
+# async driver, plain sqlite:// URLs are upgraded to aiosqlite
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./db.sqlite")
 
-# Create engine
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# SQLite engine profile (set via environment variables)
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negative = KiB
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # ms
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "10"))
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _is_file_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def _sqlite_pragmas(read_only: bool):
+    """Connect hook applying the engine profile to every new connection"""
+    def apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # First, so the statements below wait out a concurrent writer too
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+        if not read_only:
+            # Persistent once set; lets readers proceed while a write is in flight
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return apply
+
+
+def _create_engines(database_url: str):
+    """Build the read-write engine and a read-only engine for GET routes"""
+    url = make_url(database_url)
+    if url.get_backend_name() != "sqlite":
+        engine = create_async_engine(url, pool_size=DB_POOL_SIZE, pool_pre_ping=True)
+        return engine, engine
+
+    if url.drivername == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    if not _is_file_sqlite(url):
+        # In-memory databases are private to a connection: share the engine
+        engine = create_async_engine(url)
+        event.listen(engine.sync_engine, "connect", _sqlite_pragmas(read_only=False))
+        return engine, engine
+
+    engine = create_async_engine(url, pool_size=DB_POOL_SIZE)
+    event.listen(engine.sync_engine, "connect", _sqlite_pragmas(read_only=False))
+
+    read_url = url.set(
+        database=f"file:{url.database}?mode=ro",
+        query={**url.query, "uri": "true"},
+    )
+    read_engine = create_async_engine(read_url, pool_size=DB_READ_POOL_SIZE)
+    event.listen(read_engine.sync_engine, "connect", _sqlite_pragmas(read_only=True))
+    return engine, read_engine
+
+
+# Create engines
+engine, read_engine = _create_engines(SQLALCHEMY_DATABASE_URL)
+for _engine in {engine, read_engine}:
+    instrument_engine(_engine.sync_engine)
+
+# Create session factories; objects stay usable after commit so handlers
+# can serialize them without another round trip
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+ReadSessionLocal = async_sessionmaker(read_engine, autoflush=False, expire_on_commit=False)
 
 # Base class for models
 Base = declarative_base()
 
 
-def get_db():
+async def get_db():
     """Dependency to get database session"""
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def init_db():
-    """Initialize database tables"""
-    Base.metadata.create_all(bind=engine)
+async def get_read_db():
+    """Dependency to get a read-only database session"""
+    async with ReadSessionLocal() as db:
+        yield db
+
 
+async def warm_pools():
+    """Open pooled connections up front so early requests don't pay for them"""
+    for pool_engine in {engine, read_engine}:
+        size = pool_engine.pool.size() if hasattr(pool_engine.pool, "size") else 1
+        async with AsyncExitStack() as stack:
+            for _ in range(size):
+                connection = await stack.enter_async_context(pool_engine.connect())
+                await connection.exec_driver_sql("SELECT 1")
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import select, update
+from . import models
+from .cache import data_version
+from .database import SessionLocal
+from .invalidation import POINTS, bus
+from .point_index import point_index
+
+logger = logging.getLogger(__name__)
+
+# Seconds between sweeps for expired points (0 disables the job)
+EXPIRY_INTERVAL = float(os.getenv("POINT_EXPIRY_INTERVAL", "60"))
+# Points ended per UPDATE, so a large backlog never holds the write lock long
+EXPIRY_BATCH_SIZE = int(os.getenv("POINT_EXPIRY_BATCH_SIZE", "500"))
+
+
+async def expire_points(now: Optional[datetime] = None) -> int:
+    """End ongoing points whose end_date has passed; returns how many were ended"""
+    now = now or datetime.now(timezone.utc)
+    expired = (
+        select(models.DonationPoint.id)
+        .where(
+            models.DonationPoint.status == models.PointStatus.ONGOING,
+            models.DonationPoint.end_date < now,
+        )
+        .limit(EXPIRY_BATCH_SIZE)
+    )
+    statement = (
+        update(models.DonationPoint)
+        .where(models.DonationPoint.id.in_(expired))
+        .values(status=models.PointStatus.ENDED)
+        .returning(
+            models.DonationPoint.id,
+            models.DonationPoint.latitude,
+            models.DonationPoint.longitude,
+            models.DonationPoint.status,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    total = 0
+    async with SessionLocal() as db:
+        while True:
+            rows = (await db.execute(statement)).all()
+            await db.commit()
+            if not rows:
+                break
+            point_index.upsert_many([tuple(row) for row in rows])
+            await bus.publish(POINTS, [row.id for row in rows])
+            total += len(rows)
+            if len(rows) < EXPIRY_BATCH_SIZE:
+                break
+
+    if total:
+        data_version.bump()
+        logger.info("Ended %d expired donation points", total)
+    return total
+
+
+async def run_expiry(interval: float = EXPIRY_INTERVAL):
+    """Sweep for expired points forever, every `interval` seconds"""
+    while True:
+        try:
+            await expire_points()
+        except Exception:
+            logger.exception("Expiring donation points failed")
+        await asyncio.sleep(interval)
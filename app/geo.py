@@ -0,0 +1,147 @@
+import math
+from typing import List, Tuple
+import numpy as np
+
+EARTH_RADIUS_KM = 6371  # Earth radius in kilometers
+
+# (min_lat, max_lat, min_lng, max_lng)
+BoundingBox = Tuple[float, float, float, float]
+
+# Routes longer than this (km) are rejected by the route searches
+MAX_ROUTE_KM = 5000.0
+# Pieces a corridor is cut into at most, beyond one per segment; longer
+# routes get longer pieces so the box count stays bounded
+MAX_CORRIDOR_PIECES = 2000
+
+
+def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Calculate distance between two points in kilometers using Haversine formula"""
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+
+    a = (
+        math.sin(dlat / 2) ** 2
+        + math.cos(math.radians(lat1))
+        * math.cos(math.radians(lat2))
+        * math.sin(dlon / 2) ** 2
+    )
+    c = 2 * math.asin(math.sqrt(a))
+
+    return EARTH_RADIUS_KM * c
+
+
+def haversine_vector(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Haversine distance in kilometers from (lat, lng) to each of the given points"""
+    lat_r = math.radians(lat)
+    lats_r = np.radians(lats)
+    dlat = lats_r - lat_r
+    dlng = np.radians(lngs - lng)
+
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat_r) * np.cos(lats_r) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _bearing(lat1, lng1, lat2, lng2):
+    """Initial great-circle bearing in radians (inputs in radians)"""
+    dlng = lng2 - lng1
+    return np.arctan2(
+        np.sin(dlng) * np.cos(lat2),
+        np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlng),
+    )
+
+
+def segment_distances(
+    lat1: float, lng1: float, lat2: float, lng2: float, lats: np.ndarray, lngs: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Distance from each point to a great-circle segment, and where along it
+
+    Returns (distance_km, along_km): the shortest distance to the segment and
+    the distance from the segment start to the closest point on it.
+    """
+    length = haversine_distance(lat1, lng1, lat2, lng2)
+    to_start = haversine_vector(lat1, lng1, lats, lngs)
+    if length == 0:
+        return to_start, np.zeros_like(to_start)
+
+    phi1, lam1, phi2, lam2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    phis, lams = np.radians(lats), np.radians(lngs)
+    d13 = to_start / EARTH_RADIUS_KM
+    theta = _bearing(phi1, lam1, phis, lams) - _bearing(phi1, lam1, phi2, lam2)
+
+    cross = np.arcsin(np.clip(np.sin(d13) * np.sin(theta), -1.0, 1.0))
+    along = np.sign(np.cos(theta)) * np.arccos(np.clip(np.cos(d13) / np.cos(cross), -1.0, 1.0))
+    along_km = along * EARTH_RADIUS_KM
+    distance = np.abs(cross) * EARTH_RADIUS_KM
+
+    # Closest approach falls outside the segment: use the nearer endpoint
+    before = along_km <= 0
+    after = along_km >= length
+    distance = np.where(before, to_start, distance)
+    distance = np.where(after, haversine_vector(lat2, lng2, lats, lngs), distance)
+    along_km = np.clip(along_km, 0, length)
+    return distance, along_km
+
+
+def interpolate(lat1: float, lng1: float, lat2: float, lng2: float, fraction: float) -> Tuple[float, float]:
+    """Point at `fraction` of the way along the great circle between two points"""
+    phi1, lam1, phi2, lam2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    delta = haversine_distance(lat1, lng1, lat2, lng2) / EARTH_RADIUS_KM
+    if delta == 0:
+        return lat1, lng1
+    a = math.sin((1 - fraction) * delta) / math.sin(delta)
+    b = math.sin(fraction * delta) / math.sin(delta)
+    x = a * math.cos(phi1) * math.cos(lam1) + b * math.cos(phi2) * math.cos(lam2)
+    y = a * math.cos(phi1) * math.sin(lam1) + b * math.cos(phi2) * math.sin(lam2)
+    z = a * math.sin(phi1) + b * math.sin(phi2)
+    return math.degrees(math.atan2(z, math.hypot(x, y))), math.degrees(math.atan2(y, x))
+
+
+def path_length(path: List[Tuple[float, float]]) -> float:
+    """Length of a polyline in kilometers"""
+    return sum(haversine_distance(lat1, lng1, lat2, lng2) for (lat1, lng1), (lat2, lng2) in zip(path, path[1:]))
+
+
+def corridor_boxes(path: List[Tuple[float, float]], buffer_km: float) -> List[BoundingBox]:
+    """Boxes that together cover every point within buffer_km of a polyline
+
+    Each segment is cut into pieces no longer than twice the buffer and every
+    piece is covered by the bounding box of a circle around its midpoint, so
+    a long diagonal segment doesn't turn into one huge rectangle. Pieces grow
+    with the route so there are at most MAX_CORRIDOR_PIECES plus one per
+    segment.
+    """
+    segments = list(zip(path, path[1:]))
+    lengths = [haversine_distance(lat1, lng1, lat2, lng2) for (lat1, lng1), (lat2, lng2) in segments]
+    piece_km = max(2 * buffer_km, 1.0, sum(lengths) / MAX_CORRIDOR_PIECES)
+    boxes = []
+    for ((lat1, lng1), (lat2, lng2)), length in zip(segments, lengths):
+        pieces = max(1, math.ceil(length / piece_km))
+        for i in range(pieces):
+            mid_lat, mid_lng = interpolate(lat1, lng1, lat2, lng2, (i + 0.5) / pieces)
+            boxes.extend(bounding_boxes(mid_lat, mid_lng, length / pieces / 2 + buffer_km))
+    return boxes
+
+
+def bounding_boxes(lat: float, lng: float, radius_km: float) -> List[BoundingBox]:
+    """Boxes that together contain every point within radius_km of (lat, lng)
+
+    Usually a single box; two when the circle crosses the antimeridian.
+    """
+    angular = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(angular)
+    min_lat = lat - dlat
+    max_lat = lat + dlat
+
+    # Circle reaches a pole: every longitude is in range
+    if min_lat <= -90 or max_lat >= 90 or angular >= math.pi / 2:
+        return [(max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0)]
+
+    dlng = math.degrees(math.asin(min(1.0, math.sin(angular) / math.cos(math.radians(lat)))))
+    min_lng = lng - dlng
+    max_lng = lng + dlng
+
+    if min_lng < -180:
+        return [(min_lat, max_lat, min_lng + 360, 180.0), (min_lat, max_lat, -180.0, max_lng)]
+    if max_lng > 180:
+        return [(min_lat, max_lat, min_lng, 180.0), (min_lat, max_lat, -180.0, max_lng - 360)]
+    return [(min_lat, max_lat, min_lng, max_lng)]
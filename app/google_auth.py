@@ -0,0 +1,112 @@
+import asyncio
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Tuple
+
+# google-auth and requests are imported on first use: only logins need them,
+# and they are a noticeable share of the app's import time
+
+# Google token verification settings (set via environment variables)
+GOOGLE_CERTS_URL = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+GOOGLE_VERIFY_WORKERS = int(os.getenv("GOOGLE_VERIFY_WORKERS", "4"))
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+
+class CertificatesUnavailable(Exception):
+    """Google's signing certificates could not be fetched"""
+
+
+class CachingRequest:
+    """google-auth transport with a pooled session and a GET response cache
+
+    Successful GET responses are kept for as long as their Cache-Control
+    max-age allows, so Google's signing certs are fetched once per rotation
+    window instead of on every login. Concurrent misses for the same URL wait
+    for a single fetch. The underlying requests transport is built on the
+    first call.
+    """
+
+    def __init__(self, session=None):
+        self._session = session
+        self._request = None
+        self._cache: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _transport(self):
+        if self._request is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from google.auth.transport import requests as google_requests
+
+            session = self._session
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=GOOGLE_VERIFY_WORKERS)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+            self._request = google_requests.Request(session=session)
+        return self._request
+
+    def _cached(self, url: str):
+        item = self._cache.get(url)
+        if item is not None and item[0] > time.monotonic():
+            return item[1]
+        return None
+
+    def __call__(self, url, method="GET", body=None, headers=None, **kwargs):
+        if method != "GET" or body is not None:
+            return self._transport()(url, method=method, body=body, headers=headers, **kwargs)
+
+        response = self._cached(url)
+        if response is not None:
+            return response
+
+        with self._lock:
+            response = self._cached(url)
+            if response is not None:
+                return response
+            response = self._transport()(url, method=method, headers=headers, **kwargs)
+            match = MAX_AGE_PATTERN.search(response.headers.get("cache-control", ""))
+            if response.status == 200 and match:
+                self._cache[url] = (time.monotonic() + int(match.group(1)), response)
+            return response
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+# Shared transport and a dedicated pool, so a burst of logins can't occupy
+# the threads that serve every other endpoint
+transport = CachingRequest()
+_executor = ThreadPoolExecutor(max_workers=GOOGLE_VERIFY_WORKERS, thread_name_prefix="google-verify")
+
+
+def verify_id_token(token: str, client_id: str) -> dict:
+    """Verify a Google ID token and return its claims
+
+    Raises ValueError if the token is invalid, expired, meant for another
+    audience or issued by someone other than Google, and
+    CertificatesUnavailable if Google's certs can't be fetched.
+    """
+    from google.auth.exceptions import TransportError
+    from google.oauth2 import id_token
+
+    try:
+        idinfo = id_token.verify_token(token, transport, audience=client_id, certs_url=GOOGLE_CERTS_URL)
+    except TransportError as e:
+        raise CertificatesUnavailable(str(e)) from e
+    if idinfo.get("iss") not in GOOGLE_ISSUERS:
+        raise ValueError(f"Wrong issuer: {idinfo.get('iss')}")
+    return idinfo
+
+
+async def verify_id_token_async(token: str, client_id: str) -> dict:
+    """Run verify_id_token on the verification pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, verify_id_token, token, client_id)
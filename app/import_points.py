@@ -0,0 +1,48 @@
+"""Bulk import donation points from a JSON, NDJSON or CSV file
+
+    python -m app.import_points points.csv --creator-id 1
+"""
+import argparse
+import asyncio
+import sys
+from . import bulk, models
+from .database import SessionLocal
+from .migrate import init_db
+
+
+async def run(path: str, creator_id: int, format: str) -> int:
+    with open(path, "rb") as f:
+        raw_rows = bulk.parse_rows(f.read(), format)
+
+    await init_db()
+    async with SessionLocal() as db:
+        if await db.get(models.Creator, creator_id) is None:
+            print(f"Creator {creator_id} not found", file=sys.stderr)
+            return 1
+        result = await bulk.import_points(db, creator_id, raw_rows)
+
+    print(f"Imported {result.created} of {len(raw_rows)} rows")
+    for error in result.errors:
+        print(f"  row {error.row}: {'; '.join(error.errors)}", file=sys.stderr)
+    return 0 if not result.errors else 2
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import donation points")
+    parser.add_argument("path", help="file to import")
+    parser.add_argument("--creator-id", type=int, required=True, help="creator who owns the points")
+    parser.add_argument("--format", choices=bulk.FORMATS, help="defaults to the file extension")
+    args = parser.parse_args(argv)
+
+    format = args.format or bulk.detect_format(None, args.path)
+    if format is None:
+        parser.error("cannot tell the format from the file name; pass --format")
+    try:
+        return asyncio.run(run(args.path, args.creator_id, format))
+    except ValueError as e:
+        print(f"Could not parse {args.path}: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
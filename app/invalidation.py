@@ -0,0 +1,273 @@
+"""Cross-worker invalidation of in-process caches
+
+Every worker keeps its own response cache, principal cache and point index,
+so a write served by one worker has to reach the others. Write paths update
+their own process directly and publish what they changed to the bus; each
+worker's bus delivers messages from other workers to the handlers below,
+which patch or evict local state.
+
+The default backend appends messages to a table in the shared SQLite
+database and every worker polls it, so lag is bounded by
+INVALIDATION_POLL_INTERVAL. INVALIDATION_BACKEND=local turns fan-out off for
+single-process deployments.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional
+import orjson
+from sqlalchemy import select, text
+from . import models
+from .auth import principal_cache
+from .cache import data_version
+from .database import ReadSessionLocal, engine, read_engine
+from .point_index import point_index
+
+logger = logging.getLogger(__name__)
+
+# Invalidation settings (set via environment variables)
+INVALIDATION_BACKEND = os.getenv("INVALIDATION_BACKEND", "sqlite")  # sqlite | local
+INVALIDATION_POLL_INTERVAL = float(os.getenv("INVALIDATION_POLL_INTERVAL", "0.5"))  # seconds
+INVALIDATION_RETENTION = float(os.getenv("INVALIDATION_RETENTION", "3600"))  # seconds
+INVALIDATION_BATCH_SIZE = 1000  # messages read per poll
+# Messages naming more keys than this invalidate the whole topic instead
+INVALIDATION_MAX_KEYS = 1000
+# Ids per query when reloading points
+RELOAD_CHUNK = 500
+
+# Topics; keys are point and creator ids
+POINTS = "points"
+CREATORS = "creators"
+
+INVALIDATIONS_TABLE = "cache_invalidations"
+
+
+class Message(NamedTuple):
+    topic: str
+    keys: Optional[List[int]]  # None: everything in the topic
+
+
+Deliver = Callable[[List[Message]], Awaitable[None]]
+Handler = Callable[[Optional[List[int]]], Awaitable[None]]
+
+
+class LocalBackend:
+    """No fan-out: for a single worker, which already updated itself"""
+
+    async def publish(self, origin: str, messages: List[Message]):
+        pass
+
+    async def start(self, origin: str, deliver: Deliver):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class SQLiteBackend:
+    """Messages in a shared table, polled by every worker
+
+    Messages are read in sequence order. A gap before the next sequence means
+    rows were pruned before this worker read them (or a publish rolled back),
+    so it resynchronizes everything rather than risk missing a change.
+    """
+
+    def __init__(self, interval: float = INVALIDATION_POLL_INTERVAL, retention: float = INVALIDATION_RETENTION):
+        self.interval = interval
+        self.retention = retention
+        self.cursor = 0
+        self._origin = ""
+        self._deliver: Optional[Deliver] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pruned_at = 0.0
+
+    async def publish(self, origin: str, messages: List[Message]):
+        rows = [
+            {
+                "origin": origin,
+                "topic": message.topic,
+                "keys": None if message.keys is None else orjson.dumps(message.keys).decode(),
+                "created_at": time.time(),
+            }
+            for message in messages
+        ]
+        async with engine.begin() as connection:
+            await connection.execute(
+                text(
+                    f"INSERT INTO {INVALIDATIONS_TABLE} (origin, topic, keys, created_at) "
+                    "VALUES (:origin, :topic, :keys, :created_at)"
+                ),
+                rows,
+            )
+
+    async def start(self, origin: str, deliver: Deliver):
+        self._origin = origin
+        self._deliver = deliver
+        # The last sequence handed out, even if its row was pruned since
+        async with read_engine.connect() as connection:
+            self.cursor = (await connection.execute(
+                text("SELECT coalesce(max(seq), 0) FROM sqlite_sequence WHERE name = :table"),
+                {"table": INVALIDATIONS_TABLE},
+            )).scalar()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll()
+                if time.monotonic() - self._pruned_at > self.retention / 10:
+                    await self.prune()
+            except Exception:
+                logger.exception("Polling the invalidation table failed")
+
+    async def poll(self):
+        """Deliver every message published by other workers since the last poll"""
+        while True:
+            async with read_engine.connect() as connection:
+                rows = (await connection.execute(
+                    text(
+                        f"SELECT seq, origin, topic, keys FROM {INVALIDATIONS_TABLE} "
+                        "WHERE seq > :cursor ORDER BY seq LIMIT :limit"
+                    ),
+                    {"cursor": self.cursor, "limit": INVALIDATION_BATCH_SIZE},
+                )).all()
+            if not rows:
+                return
+            if rows[0].seq != self.cursor + 1:
+                logger.warning("Invalidation messages after %d were missed; resynchronizing", self.cursor)
+                messages = [Message(topic, None) for topic in (POINTS, CREATORS)]
+            else:
+                messages = [
+                    Message(row.topic, None if row.keys is None else orjson.loads(row.keys))
+                    for row in rows
+                    if row.origin != self._origin
+                ]
+            self.cursor = rows[-1].seq
+            if messages:
+                await self._deliver(messages)
+            if len(rows) < INVALIDATION_BATCH_SIZE:
+                return
+
+    async def prune(self):
+        """Drop messages older than the retention window"""
+        async with engine.begin() as connection:
+            await connection.execute(
+                text(f"DELETE FROM {INVALIDATIONS_TABLE} WHERE created_at < :cutoff"),
+                {"cutoff": time.time() - self.retention},
+            )
+        self._pruned_at = time.monotonic()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+BACKENDS = {"local": LocalBackend, "sqlite": SQLiteBackend}
+
+
+class InvalidationBus:
+    """Publishes local writes to other workers and applies theirs here"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.origin = uuid.uuid4().hex
+        self.handlers: Dict[str, List[Handler]] = defaultdict(list)
+
+    def subscribe(self, topic: str, handler: Handler):
+        self.handlers[topic].append(handler)
+
+    async def publish(self, topic: str, keys: Optional[Iterable[int]] = None):
+        """Tell other workers that `keys` in `topic` changed; None means all of them
+
+        Call after the write committed. A failure is logged rather than
+        raised, since the write itself succeeded; other workers then catch
+        up through the cache TTLs.
+        """
+        if keys is not None:
+            keys = list(keys)
+            if not keys:
+                return
+            if len(keys) > INVALIDATION_MAX_KEYS:
+                keys = None
+        try:
+            await self.backend.publish(self.origin, [Message(topic, keys)])
+        except Exception:
+            logger.exception("Publishing an invalidation for %s failed", topic)
+
+    async def deliver(self, messages: List[Message]):
+        """Run the handlers once per topic with the union of the keys"""
+        merged: Dict[str, Optional[set]] = {}
+        for message in messages:
+            if message.topic in merged and merged[message.topic] is None:
+                continue
+            if message.keys is None:
+                merged[message.topic] = None
+            else:
+                merged.setdefault(message.topic, set()).update(message.keys)
+        for topic, keys in merged.items():
+            for handler in self.handlers.get(topic, ()):
+                try:
+                    await handler(None if keys is None else sorted(keys))
+                except Exception:
+                    logger.exception("Applying invalidations for %s failed", topic)
+
+    async def start(self):
+        await self.backend.start(self.origin, self.deliver)
+
+    async def stop(self):
+        await self.backend.stop()
+
+
+async def reload_points(ids: Optional[List[int]]):
+    """Refresh points written by another worker in the local point index
+
+    While the index is still loading, the rows read here are queued by the
+    index and replayed once the load finishes; before any load, there is
+    nothing to refresh.
+    """
+    if point_index.loaded or point_index.loading:
+        async with ReadSessionLocal() as db:
+            if ids is None:
+                await point_index.load(db)
+            else:
+                for offset in range(0, len(ids), RELOAD_CHUNK):
+                    chunk = ids[offset:offset + RELOAD_CHUNK]
+                    result = await db.execute(
+                        select(
+                            models.DonationPoint.id,
+                            models.DonationPoint.latitude,
+                            models.DonationPoint.longitude,
+                            models.DonationPoint.status,
+                        ).where(models.DonationPoint.id.in_(chunk))
+                    )
+                    rows = [tuple(row) for row in result]
+                    point_index.upsert_many(rows)
+                    # Points that are gone were deleted
+                    found = {row[0] for row in rows}
+                    point_index.remove_many([point_id for point_id in chunk if point_id not in found])
+    data_version.bump()
+
+
+async def forget_creators(ids: Optional[List[int]]):
+    """Evict creators changed by another worker from the principal cache"""
+    if ids is None:
+        principal_cache.clear()
+    else:
+        for creator_id in ids:
+            principal_cache.invalidate(creator_id)
+    data_version.bump()
+
+
+bus = InvalidationBus(BACKENDS[INVALIDATION_BACKEND]())
+bus.subscribe(POINTS, reload_points)
+bus.subscribe(CREATORS, forget_creators)
+
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional, Set
+import orjson
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+from .changes import DELETE, point_changes
+from .database import ReadSessionLocal
+from .geo import BoundingBox
+from .serialization import JSON_OPTIONS, POINT_COLUMNS, point_dicts
+
+logger = logging.getLogger(__name__)
+
+# Live feed settings (set via environment variables)
+LIVE_POLL_INTERVAL = float(os.getenv("LIVE_POLL_INTERVAL", "0.5"))  # seconds
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "256"))  # events per subscriber
+LIVE_HEARTBEAT = float(os.getenv("LIVE_HEARTBEAT", "15"))  # seconds between keepalives
+LIVE_BATCH_SIZE = 1000  # change log entries read per poll
+
+# Event types; "resync" tells a client it fell behind and should catch up
+# through /changes from its last seen sequence
+CREATE, UPDATE, END, REMOVE, RESYNC = "create", "update", "end", "delete", "resync"
+
+
+class Subscriber:
+    """One live feed client: an optional area of interest and a bounded queue"""
+
+    def __init__(self, bbox: Optional[BoundingBox] = None, maxsize: int = LIVE_QUEUE_SIZE):
+        self.bbox = bbox
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    def wants(self, event: Dict[str, Any]) -> bool:
+        if self.bbox is None or event["point"] is None:
+            return True
+        min_lat, max_lat, min_lng, max_lng = self.bbox
+        point = event["point"]
+        if not min_lat <= point["latitude"] <= max_lat:
+            return False
+        if min_lng <= max_lng:
+            return min_lng <= point["longitude"] <= max_lng
+        # Box crossing the antimeridian
+        return point["longitude"] >= min_lng or point["longitude"] <= max_lng
+
+    def offer(self, event: Dict[str, Any]):
+        """Queue an event without blocking the broadcaster
+
+        A subscriber whose queue is full is too slow to keep up: its backlog
+        is replaced by a single resync event rather than growing unbounded or
+        stalling delivery to everyone else.
+        """
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": RESYNC, "seq": event["seq"], "id": None, "point": None})
+
+
+async def load_events(db: AsyncSession, since: int, limit: int, max_point_id: int) -> List[Dict[str, Any]]:
+    """Events for change log entries after `since`, oldest first
+
+    The log keeps only each point's latest operation, so inserts are told
+    apart from updates by id: points above `max_point_id` are new.
+    """
+    query = (
+        select(point_changes.c.seq, point_changes.c.op, point_changes.c.point_id, *POINT_COLUMNS)
+        .select_from(point_changes)
+        .outerjoin(models.DonationPoint, models.DonationPoint.id == point_changes.c.point_id)
+        .where(point_changes.c.seq > since)
+        .order_by(point_changes.c.seq)
+        .limit(limit)
+    )
+    rows = (await db.execute(query)).all()
+    points = iter(point_dicts(row for row in rows if row.op != DELETE))
+    events = []
+    for row in rows:
+        if row.op == DELETE:
+            events.append({"type": REMOVE, "seq": row.seq, "id": row.point_id, "point": None})
+            continue
+        point = next(points)
+        if point["status"] == models.PointStatus.ENDED:
+            event_type = END
+        elif row.point_id > max_point_id:
+            event_type = CREATE
+        else:
+            event_type = UPDATE
+        events.append({"type": event_type, "seq": row.seq, "id": row.point_id, "point": point})
+    return events
+
+
+def format_event(event: Dict[str, Any]) -> bytes:
+    """An event in text/event-stream framing; the sequence is the event id"""
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (
+        event["seq"], event["type"].encode(), orjson.dumps(event, option=JSON_OPTIONS)
+    )
+
+
+class Broadcaster:
+    """Tails the change log once per process and fans events out to subscribers
+
+    Polling runs only while someone is subscribed, so idle map tabs cost one
+    cheap indexed query per interval in total rather than a radius search
+    each.
+    """
+
+    def __init__(self, interval: float = LIVE_POLL_INTERVAL):
+        self.interval = interval
+        self.subscribers: Set[Subscriber] = set()
+        self.cursor = 0
+        self.max_point_id = 0
+        self._task: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+
+    async def subscribe(self, subscriber: Subscriber) -> int:
+        """Register a subscriber; returns the sequence its live events start after"""
+        async with self._start_lock:
+            if self._task is None:
+                async with ReadSessionLocal() as db:
+                    self.cursor = await db.scalar(select(func.coalesce(func.max(point_changes.c.seq), 0)))
+                    self.max_point_id = await db.scalar(
+                        select(func.coalesce(func.max(models.DonationPoint.id), 0))
+                    )
+                self._task = asyncio.create_task(self._run())
+            self.subscribers.add(subscriber)
+            return self.cursor
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def _run(self):
+        while self.subscribers:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Polling the change log failed")
+        self._task = None
+
+    async def poll(self):
+        """Deliver every change logged since the last poll"""
+        while True:
+            async with ReadSessionLocal() as db:
+                events = await load_events(db, self.cursor, LIVE_BATCH_SIZE, self.max_point_id)
+            for event in events:
+                for subscriber in list(self.subscribers):
+                    if subscriber.wants(event):
+                        subscriber.offer(event)
+                self.cursor = event["seq"]
+                self.max_point_id = max(self.max_point_id, event["id"])
+            if len(events) < LIVE_BATCH_SIZE:
+                return
+
+    async def stop(self):
+        self.subscribers.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+broadcaster = Broadcaster()
+
+
+async def event_stream(subscriber: Subscriber, live_from: int, last_event_id: Optional[int]):
+    """Body of a live feed response: missed events, then live ones, with keepalives
+
+    A client reconnecting with Last-Event-ID first gets the changes it missed
+    from the log, or a resync event if it missed too many.
+    """
+    try:
+        yield b"retry: 3000\n\n"
+        if last_event_id is not None and last_event_id < live_from:
+            async with ReadSessionLocal() as db:
+                # Points the client never saw are sent as updates; clients
+                # treat both as upserts
+                missed = await load_events(db, last_event_id, LIVE_BATCH_SIZE, max_point_id=2 ** 63)
+            if len(missed) == LIVE_BATCH_SIZE and missed[-1]["seq"] < live_from:
+                missed = [{"type": RESYNC, "seq": last_event_id, "id": None, "point": None}]
+            missed = [event for event in missed if event["seq"] <= live_from]
+            for event in missed:
+                if subscriber.wants(event):
+                    yield format_event(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), LIVE_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        broadcaster.unsubscribe(subscriber)
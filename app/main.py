@@ -1,18 +1,62 @@
-from fastapi import FastAPI
+import asyncio
+import os
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from .database import init_db
+from fastapi.middleware.gzip import GZipMiddleware
+from . import auth
+from .cache import ResponseCacheMiddleware
+from .database import ReadSessionLocal, warm_pools
+from .expiry import EXPIRY_INTERVAL, run_expiry
+from .invalidation import bus
+from .live import broadcaster
+from .metrics import METRICS_CONTENT_TYPE, MetricsMiddleware, TimedJSONResponse, metrics
+from .migrate import init_db
+from .point_index import point_index
 from .routers import creators, donation_points, admin
 
-# Initialize database
-init_db()
+# Responses smaller than this (bytes) are sent uncompressed
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1024"))
+
+# Build the in-memory point index before serving instead of on the first
+# geo query; turn off to come up faster on very large tables
+WARM_POINT_INDEX = os.getenv("WARM_POINT_INDEX", "1") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize the database and warm caches before serving requests, and run the expiry job"""
+    await init_db()
+    # Subscribe before warming: writes by other workers during the initial
+    # index load are queued by the index and replayed once it is built
+    await bus.start()
+    await warm_pools()
+    auth.jwt_codec()
+    if WARM_POINT_INDEX:
+        async with ReadSessionLocal() as db:
+            await point_index.ensure_loaded(db)
+    expiry_task = asyncio.create_task(run_expiry()) if EXPIRY_INTERVAL > 0 else None
+    yield
+    await broadcaster.stop()
+    await bus.stop()
+    if expiry_task:
+        expiry_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await expiry_task
+
 
 # Create FastAPI app
 app = FastAPI(
     title="Donation Points API",
     description="Backend API for donation points map application",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse
 )
 
+# Cache read endpoints (added before CORS so CORS headers stay per-request)
+app.add_middleware(ResponseCacheMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -22,6 +66,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress outside the cache, so cached bodies serve any Accept-Encoding
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+
+# Outermost, so timings cover the whole stack including cache hits
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(creators.router)
 app.include_router(donation_points.router)
@@ -44,5 +94,13 @@ def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Request and database metrics in Prometheus text format"""
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=8000)
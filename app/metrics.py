@@ -0,0 +1,240 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Requests slower than this are logged with their SQL (milliseconds, 0 disables)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+
+class RequestStats:
+    """Database and serialization work done while handling one request"""
+
+    def __init__(self, record_sql: bool = False):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.rows = 0
+        self.serialize_seconds = 0.0
+        # (statement, seconds) pairs, kept only when the slow log needs them
+        self.statements: Optional[List[Tuple[str, float]]] = [] if record_sql else None
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Metrics:
+    """Process-wide request and database metrics, rendered for Prometheus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.requests: Dict[tuple, int] = {}
+        self.latency: Dict[tuple, Histogram] = {}
+        self.queries_per_request: Dict[tuple, Histogram] = {}
+        self.query_seconds: Dict[tuple, float] = {}
+        self.rows: Dict[tuple, int] = {}
+        self.serialize_seconds: Dict[tuple, float] = {}
+        self.queries_total = 0
+
+    def record_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        labels = (method, route)
+        with self._lock:
+            key = (method, route, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.setdefault(labels, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.queries_per_request.setdefault(labels, Histogram(QUERY_COUNT_BUCKETS)).observe(stats.queries)
+            self.query_seconds[labels] = self.query_seconds.get(labels, 0.0) + stats.query_seconds
+            self.rows[labels] = self.rows.get(labels, 0) + stats.rows
+            self.serialize_seconds[labels] = self.serialize_seconds.get(labels, 0.0) + stats.serialize_seconds
+
+    def record_query(self):
+        with self._lock:
+            self.queries_total += 1
+
+    def render(self) -> str:
+        """Current values in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            _counter(lines, "http_requests_total", "Requests handled", ("method", "route", "status"), self.requests)
+            _histogram(lines, "http_request_duration_seconds", "Request latency", self.latency)
+            _histogram(lines, "db_queries_per_request", "Database queries issued per request", self.queries_per_request)
+            _counter(lines, "db_query_duration_seconds_total", "Time spent in database queries", ("method", "route"), self.query_seconds)
+            _counter(lines, "db_rows_loaded_total", "Rows loaded, as ORM objects or plain rows", ("method", "route"), self.rows)
+            _counter(lines, "response_serialize_seconds_total", "Time spent rendering response bodies", ("method", "route"), self.serialize_seconds)
+            _counter(lines, "db_queries_total", "Database queries issued, in or out of requests", (), {(): self.queries_total})
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _counter(lines, name, help, label_names, values):
+    lines.append(f"# HELP {name} {help}")
+    lines.append(f"# TYPE {name} counter")
+    for labels, value in sorted(values.items()):
+        lines.append(f"{name}{_labels(label_names, labels)} {value}")
+
+
+def _histogram(lines, name, help, histograms):
+    lines.append(f"# HELP {name} {help}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, histogram in sorted(histograms.items()):
+        label_names = ("method", "route")
+        cumulative = 0
+        for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+            cumulative += count
+            bucket = 'le="%s"' % bound
+            lines.append(f"{name}_bucket{_labels(label_names, labels, bucket)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(label_names, labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(label_names, labels)} {cumulative}")
+
+
+metrics = Metrics()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics.record_query()
+    stats = _current.get()
+    if stats is None:
+        return
+    seconds = time.perf_counter() - context._query_start
+    stats.queries += 1
+    stats.query_seconds += seconds
+    if stats.statements is not None:
+        stats.statements.append((statement, seconds))
+
+
+def _loaded_as_persistent(session, instance):
+    record_rows(1)
+
+
+def record_rows(count: int):
+    """Charge rows loaded from the database to the current request
+
+    ORM objects are counted as they load; code reading plain Core rows
+    reports them itself.
+    """
+    stats = _current.get()
+    if stats is not None:
+        stats.rows += count
+
+
+def instrument_engine(sync_engine):
+    """Count and time every query run through an engine"""
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+event.listen(Session, "loaded_as_persistent", _loaded_as_persistent)
+
+
+def record_serialization(seconds: float):
+    """Charge time spent rendering a response body to the current request"""
+    stats = _current.get()
+    if stats is not None:
+        stats.serialize_seconds += seconds
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSON response that charges its rendering time to the current request"""
+
+    def render(self, content) -> bytes:
+        start = time.perf_counter()
+        body = super().render(content)
+        record_serialization(time.perf_counter() - start)
+        return body
+
+
+class MetricsMiddleware:
+    """Time each request and attribute its database work to the matched route"""
+
+    def __init__(self, app, registry: Metrics = metrics, slow_request_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.registry = registry
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(record_sql=self.slow_request_ms > 0)
+        token = _current.set(stats)
+        status_code = 500
+        cache_hit = False
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code, cache_hit
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                cache_hit = (b"x-cache", b"HIT") in message.get("headers", [])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            seconds = time.perf_counter() - start
+            _current.reset(token)
+            # The router records the matched route on the scope; label by its
+            # template so ids in paths don't explode the label set; cache hits
+            # never reach the router
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or ("cached" if cache_hit else "unmatched")
+            self.registry.record_request(scope["method"], route_path, status_code, seconds, stats)
+            if self.slow_request_ms and seconds * 1000 >= self.slow_request_ms:
+                self._log_slow(scope, status_code, seconds, stats)
+
+    def _log_slow(self, scope, status_code: int, seconds: float, stats: RequestStats):
+        statements = "".join(
+            f"\n  [{query_seconds * 1000:.1f} ms] {statement}" for statement, query_seconds in stats.statements
+        )
+        logger.warning(
+            "Slow request %s %s -> %d in %.1f ms (%d queries, %.1f ms in db, %d rows)%s",
+            scope["method"], scope["path"], status_code, seconds * 1000,
+            stats.queries, stats.query_seconds * 1000, stats.rows, statements,
+        )
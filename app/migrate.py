@@ -0,0 +1,478 @@
+"""Versioned schema migrations
+
+Applied migrations are recorded in `schema_migrations`. An upgrade takes the
+database write lock (BEGIN IMMEDIATE), re-reads which versions are applied
+and runs every pending one in that single transaction, so concurrent
+upgrades serialize: the first applies the migrations and the rest find
+nothing left to do. SQLite readers keep working throughout (WAL), so
+upgrades can run against a live database.
+
+Each version runs literal DDL written for it: once released, a migration's
+statements never change, and schema changes go in a new version. Steps use
+IF NOT EXISTS and column checks, so databases created by the old
+create-on-start code adopt the history in place.
+
+Migrations run only when invoked, not on import or startup; set
+AUTO_MIGRATE=1 to have the app upgrade on startup, e.g. in development.
+
+    python -m app.migrate upgrade [--to VERSION]   # apply pending migrations
+    python -m app.migrate status                   # list applied and pending migrations
+    python -m app.migrate check                    # assert hot queries use their indexes
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from typing import Callable, List, NamedTuple, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from .database import engine
+
+logger = logging.getLogger(__name__)
+
+# Apply pending migrations on startup instead of refusing to start
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "0") == "1"
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, name: str):
+    """Register a migration; versions must be added in increasing order"""
+    def register(apply):
+        assert not MIGRATIONS or version > MIGRATIONS[-1].version, "migration versions must increase"
+        MIGRATIONS.append(Migration(version, name, apply))
+        return apply
+    return register
+
+
+def _execute(connection, statements: List[str]):
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def _table_exists(connection, name: str) -> bool:
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": name}
+    ).first() is not None
+
+
+@migration(1, "initial_schema")
+def _initial_schema(connection):
+    _execute(connection, [
+        """
+        CREATE TABLE IF NOT EXISTS creators (
+            id INTEGER NOT NULL,
+            name VARCHAR NOT NULL,
+            email VARCHAR NOT NULL,
+            password_hash VARCHAR,
+            google_id VARCHAR,
+            verified BOOLEAN NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id),
+            UNIQUE (google_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_creators_id ON creators (id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_creators_email ON creators (email)",
+        """
+        CREATE TABLE IF NOT EXISTS donation_points (
+            id INTEGER NOT NULL,
+            creator_id INTEGER NOT NULL,
+            organization_name VARCHAR NOT NULL,
+            address VARCHAR NOT NULL,
+            latitude FLOAT NOT NULL,
+            longitude FLOAT NOT NULL,
+            description VARCHAR,
+            start_date DATETIME,
+            end_date DATETIME,
+            status VARCHAR(7) NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id),
+            FOREIGN KEY(creator_id) REFERENCES creators (id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_donation_points_id ON donation_points (id)",
+    ])
+
+
+@migration(2, "search_index")
+def _search_index(connection):
+    # FTS5 external-content indexes over point and creator text; accents are
+    # folded and 2-3 character prefixes get their own index
+    indexes = {
+        "donation_points_fts": [
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS donation_points_fts
+            USING fts5(organization_name, address, description, content='donation_points', content_rowid='id',
+                       tokenize='unicode61 remove_diacritics 2', prefix='2 3')
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS donation_points_fts_insert AFTER INSERT ON donation_points BEGIN
+                INSERT INTO donation_points_fts (rowid, organization_name, address, description)
+                VALUES (new.id, new.organization_name, new.address, new.description);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS donation_points_fts_delete AFTER DELETE ON donation_points BEGIN
+                INSERT INTO donation_points_fts (donation_points_fts, rowid, organization_name, address, description)
+                VALUES ('delete', old.id, old.organization_name, old.address, old.description);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS donation_points_fts_update
+            AFTER UPDATE OF organization_name, address, description ON donation_points BEGIN
+                INSERT INTO donation_points_fts (donation_points_fts, rowid, organization_name, address, description)
+                VALUES ('delete', old.id, old.organization_name, old.address, old.description);
+                INSERT INTO donation_points_fts (rowid, organization_name, address, description)
+                VALUES (new.id, new.organization_name, new.address, new.description);
+            END
+            """,
+        ],
+        "creators_fts": [
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS creators_fts
+            USING fts5(name, email, content='creators', content_rowid='id',
+                       tokenize='unicode61 remove_diacritics 2', prefix='2 3')
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS creators_fts_insert AFTER INSERT ON creators BEGIN
+                INSERT INTO creators_fts (rowid, name, email) VALUES (new.id, new.name, new.email);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS creators_fts_delete AFTER DELETE ON creators BEGIN
+                INSERT INTO creators_fts (creators_fts, rowid, name, email)
+                VALUES ('delete', old.id, old.name, old.email);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS creators_fts_update AFTER UPDATE OF name, email ON creators BEGIN
+                INSERT INTO creators_fts (creators_fts, rowid, name, email)
+                VALUES ('delete', old.id, old.name, old.email);
+                INSERT INTO creators_fts (rowid, name, email) VALUES (new.id, new.name, new.email);
+            END
+            """,
+        ],
+    }
+    for name, statements in indexes.items():
+        exists = _table_exists(connection, name)
+        _execute(connection, statements)
+        if not exists:
+            # Index the rows written before the index existed
+            connection.execute(text(f"INSERT INTO {name} ({name}) VALUES ('rebuild')"))
+
+
+@migration(3, "point_change_log")
+def _point_change_log(connection):
+    # One entry per point, under a new sequence number on every write
+    _execute(connection, [
+        """
+        CREATE TABLE IF NOT EXISTS point_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            point_id INTEGER NOT NULL,
+            op TEXT NOT NULL
+        )
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_point_changes_point_id ON point_changes (point_id)",
+        """
+        CREATE TRIGGER IF NOT EXISTS donation_points_changes_insert
+        AFTER INSERT ON donation_points BEGIN
+            DELETE FROM point_changes WHERE point_id = new.id;
+            INSERT INTO point_changes (point_id, op) VALUES (new.id, 'upsert');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS donation_points_changes_update
+        AFTER UPDATE ON donation_points BEGIN
+            DELETE FROM point_changes WHERE point_id = new.id;
+            INSERT INTO point_changes (point_id, op) VALUES (new.id, 'upsert');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS donation_points_changes_delete
+        AFTER DELETE ON donation_points BEGIN
+            DELETE FROM point_changes WHERE point_id = old.id;
+            INSERT INTO point_changes (point_id, op) VALUES (old.id, 'delete');
+        END
+        """,
+        """
+        INSERT INTO point_changes (point_id, op)
+        SELECT id, 'upsert' FROM donation_points
+        WHERE id NOT IN (SELECT point_id FROM point_changes)
+        ORDER BY id
+        """,
+    ])
+
+
+@migration(4, "creator_verified")
+def _creator_verified(connection):
+    # donation_points.creator_verified copies creators.verified so searches
+    # can filter on it from an index. Inserts set it from the creator in the
+    # same statement; the trigger carries (un)verification over to the
+    # creator's existing points
+    columns = {row[1] for row in connection.execute(text("PRAGMA table_info(donation_points)"))}
+    if "creator_verified" not in columns:
+        _execute(connection, [
+            "ALTER TABLE donation_points ADD COLUMN creator_verified BOOLEAN NOT NULL DEFAULT 0",
+            """
+            UPDATE donation_points SET creator_verified = COALESCE(
+                (SELECT verified FROM creators WHERE creators.id = donation_points.creator_id), 0
+            )
+            """,
+        ])
+    _execute(connection, [
+        """
+        CREATE TRIGGER IF NOT EXISTS creators_verified_sync
+        AFTER UPDATE OF verified ON creators
+        WHEN new.verified IS NOT old.verified BEGIN
+            UPDATE donation_points SET creator_verified = new.verified WHERE creator_id = new.id;
+        END
+        """,
+    ])
+
+
+@migration(5, "performance_indexes")
+def _performance_indexes(connection):
+    _execute(connection, [
+        "CREATE INDEX IF NOT EXISTS ix_donation_points_creator_id ON donation_points (creator_id)",
+        # Expiry sweep: ongoing points past their end date
+        "CREATE INDEX IF NOT EXISTS ix_donation_points_status_end_date ON donation_points (status, end_date)",
+        # Default listings only touch live rows however much history
+        # accumulates; led by status, so `status = 'ONGOING' AND id > ?` seeks
+        # it instead of the rowid range
+        "CREATE INDEX IF NOT EXISTS ix_donation_points_ongoing ON donation_points (status, id) WHERE status = 'ONGOING'",
+        "CREATE INDEX IF NOT EXISTS ix_donation_points_status_verified ON donation_points (status, creator_verified)",
+        "CREATE INDEX IF NOT EXISTS ix_donation_points_status_creator ON donation_points (status, creator_id)",
+    ])
+
+
+@migration(6, "invalidation_log")
+def _invalidation_log(connection):
+    _execute(connection, [
+        """
+        CREATE TABLE IF NOT EXISTS cache_invalidations (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            origin TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            keys TEXT,
+            created_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_cache_invalidations_created_at ON cache_invalidations (created_at)",
+    ])
+
+
+def _refresh_statistics(connection):
+    """Sample fresh planner statistics so partial indexes get picked
+
+    Without sqlite_stat1 the planner assumes any equality on the first
+    index column is selective; the analysis limit keeps this quick on large
+    tables.
+    """
+    connection.exec_driver_sql("PRAGMA analysis_limit = 1000")
+    connection.exec_driver_sql("ANALYZE")
+
+
+def _applied_versions(connection) -> List[int]:
+    if not _table_exists(connection, MIGRATIONS_TABLE):
+        return []
+    return [row[0] for row in connection.execute(text(f"SELECT version FROM {MIGRATIONS_TABLE} ORDER BY version"))]
+
+
+async def pending_migrations(bind: AsyncEngine = engine) -> List[Migration]:
+    async with bind.connect() as connection:
+        applied = set(await connection.run_sync(_applied_versions))
+    return [step for step in MIGRATIONS if step.version not in applied]
+
+
+async def upgrade(bind: AsyncEngine = engine, target: Optional[int] = None) -> List[Migration]:
+    """Apply pending migrations up to `target` (default: all); returns the ones applied
+
+    Statistics are refreshed afterwards even when nothing was pending, so
+    running an upgrade after a bulk load also re-tunes the planner.
+    """
+    async with bind.connect() as connection:
+        # Take the write lock before reading the applied versions, so a
+        # concurrent upgrade waits here and then sees this one's work
+        await connection.exec_driver_sql("BEGIN IMMEDIATE")
+        await connection.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        applied = set(await connection.run_sync(_applied_versions))
+        pending = [
+            step for step in MIGRATIONS
+            if step.version not in applied and (target is None or step.version <= target)
+        ]
+        for step in pending:
+            logger.info("Applying migration %d %s", step.version, step.name)
+            await connection.run_sync(step.apply)
+            await connection.execute(
+                text(f"INSERT INTO {MIGRATIONS_TABLE} (version, name) VALUES (:version, :name)"),
+                {"version": step.version, "name": step.name},
+            )
+        await connection.run_sync(_refresh_statistics)
+        await connection.commit()
+    return pending
+
+
+async def init_db(bind: AsyncEngine = engine):
+    """Upgrade on startup if AUTO_MIGRATE is set; otherwise refuse to run on an outdated schema"""
+    if AUTO_MIGRATE:
+        await upgrade(bind)
+        return
+    pending = await pending_migrations(bind)
+    if pending:
+        raise RuntimeError(
+            f"Database is {len(pending)} migration(s) behind; run `python -m app.migrate upgrade`"
+        )
+
+
+class PlanCheck(NamedTuple):
+    description: str
+    table: str
+    sql: str
+    access: tuple  # Any of these access paths satisfies the check
+
+
+# Hot queries and how they must be answered; a plan that sorts in a temporary
+# B-tree fails regardless
+PLAN_CHECKS = [
+    PlanCheck(
+        "ongoing listing, first page",
+        "donation_points",
+        "SELECT * FROM donation_points WHERE status = 'ONGOING' ORDER BY id LIMIT 50",
+        ("ix_donation_points_ongoing",),
+    ),
+    PlanCheck(
+        "ongoing listing after an id",
+        "donation_points",
+        "SELECT * FROM donation_points WHERE status = 'ONGOING' AND id > 0 ORDER BY id LIMIT 50",
+        ("ix_donation_points_ongoing",),
+    ),
+    PlanCheck(
+        "expired point sweep",
+        "donation_points",
+        "SELECT id FROM donation_points WHERE status = 'ONGOING' AND end_date < '2100-01-01' LIMIT 500",
+        ("ix_donation_points_status_end_date",),
+    ),
+    PlanCheck(
+        "verified-creator filter",
+        "donation_points",
+        "SELECT id FROM donation_points WHERE status = 'ONGOING' AND creator_verified = 1 ORDER BY id LIMIT 50",
+        ("ix_donation_points_status_verified",),
+    ),
+    PlanCheck(
+        "points by creator and status",
+        "donation_points",
+        "SELECT id FROM donation_points WHERE status = 'ONGOING' AND creator_id = 1",
+        ("ix_donation_points_status_creator",),
+    ),
+    PlanCheck(
+        "points by creator",
+        "donation_points",
+        "SELECT id FROM donation_points WHERE creator_id = 1",
+        ("ix_donation_points_creator_id",),
+    ),
+    PlanCheck(
+        "creator by Google id",
+        "creators",
+        "SELECT id FROM creators WHERE google_id = 'x'",
+        ("sqlite_autoindex_creators",),
+    ),
+    PlanCheck(
+        "creator by email",
+        "creators",
+        "SELECT id FROM creators WHERE email = 'x'",
+        ("ix_creators_email", "sqlite_autoindex_creators"),
+    ),
+    PlanCheck(
+        "change log since a sequence",
+        "point_changes",
+        "SELECT seq FROM point_changes WHERE seq > 0 ORDER BY seq LIMIT 1000",
+        ("INTEGER PRIMARY KEY",),
+    ),
+    PlanCheck(
+        "change log entry for a point",
+        "point_changes",
+        "SELECT seq FROM point_changes WHERE point_id = 1",
+        ("ix_point_changes_point_id",),
+    ),
+]
+
+PASS, FAIL, SKIP = "ok", "FAIL", "skip"
+
+# Below this many rows a scan is the right plan, so checks are skipped
+PLAN_CHECK_MIN_ROWS = 1000
+
+
+def _check_plans(connection) -> List[Tuple[PlanCheck, str, str]]:
+    results = []
+    for check in PLAN_CHECKS:
+        plan = " | ".join(row[-1] for row in connection.execute(text("EXPLAIN QUERY PLAN " + check.sql)))
+        rows = connection.execute(
+            text(f"SELECT count(*) FROM (SELECT 1 FROM {check.table} LIMIT {PLAN_CHECK_MIN_ROWS})")
+        ).scalar()
+        if rows < PLAN_CHECK_MIN_ROWS:
+            outcome = SKIP
+        elif any(access in plan for access in check.access) and "TEMP B-TREE" not in plan:
+            outcome = PASS
+        else:
+            outcome = FAIL
+        results.append((check, outcome, plan))
+    return results
+
+
+async def check_plans(bind: AsyncEngine = engine) -> List[Tuple[PlanCheck, str, str]]:
+    """Run EXPLAIN QUERY PLAN for each hot query; returns (check, outcome, plan)"""
+    async with bind.connect() as connection:
+        return await connection.run_sync(_check_plans)
+
+
+async def run(command: str, target: Optional[int] = None) -> int:
+    if command == "upgrade":
+        applied = await upgrade(target=target)
+        for step in applied:
+            print(f"applied {step.version:>4} {step.name}")
+        if not applied:
+            print("already up to date")
+        return 0
+
+    if command == "status":
+        pending = {step.version for step in await pending_migrations()}
+        for step in MIGRATIONS:
+            print(f"{'pending' if step.version in pending else 'applied':<8} {step.version:>4} {step.name}")
+        return 0
+
+    results = await check_plans()
+    for check, outcome, plan in results:
+        print(f"{outcome:<5} {check.description}")
+        if outcome == FAIL:
+            print(f"      {plan}")
+    return 1 if any(outcome == FAIL for _, outcome, _ in results) else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Manage the database schema")
+    parser.add_argument("command", choices=["upgrade", "status", "check"])
+    parser.add_argument("--to", type=int, dest="target", help="upgrade only up to this version")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    return asyncio.run(run(args.command, args.target))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
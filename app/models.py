@@ -1,15 +1,48 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Enum as SQLEnum, select
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import false, func
+from sqlalchemy.types import TypeDecorator
+from datetime import timezone
 import enum
 from .database import Base
 
 
+class UTCDateTime(TypeDecorator):
+    """Datetime stored as naive UTC and read back as aware UTC
+
+    SQLite keeps no offset, so aware values are converted to UTC on the way
+    in; naive values are taken to be UTC already. Queries comparing against
+    these columns go through the same conversion.
+    """
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value
+
+
 class PointStatus(str, enum.Enum):
     ONGOING = "ongoing"
     ENDED = "ended"
 
 
+class StatusFilter(str, enum.Enum):
+    ONGOING = "ongoing"
+    ENDED = "ended"
+    ALL = "all"
+
+    def point_status(self):
+        """The PointStatus to filter on, or None for all points"""
+        return None if self is StatusFilter.ALL else PointStatus(self.value)
+
+
 class Creator(Base):
     __tablename__ = "creators"
 
@@ -35,11 +68,21 @@ class DonationPoint(Base):
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
     description = Column(String)
-    start_date = Column(DateTime(timezone=True))
-    end_date = Column(DateTime(timezone=True))
+    start_date = Column(UTCDateTime)
+    end_date = Column(UTCDateTime)
     status = Column(SQLEnum(PointStatus), default=PointStatus.ONGOING, nullable=False)
+    # Copy of creator.verified, set by the INSERT (see creator_verified_of)
+    # and kept in sync by a trigger when the creator is (un)verified
+    creator_verified = Column(Boolean, default=False, server_default=false(), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationship
     creator = relationship("Creator", back_populates="donation_points")
 
+    # Indexes beyond the baseline ones are declared only in the migrations
+    # (app/migrate.py), so the two can't drift apart
+
+
+def creator_verified_of(creator_id: int):
+    """creator_verified for a new point: its creator's flag, read by the INSERT itself"""
+    return select(Creator.verified).where(Creator.id == creator_id).scalar_subquery()
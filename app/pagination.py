@@ -0,0 +1,48 @@
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+import orjson
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from .database import ReadSessionLocal
+from .serialization import JSON_OPTIONS
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Rows fetched per round trip while streaming
+STREAM_BATCH_SIZE = 500
+
+
+def paginate(statement: Select, id_column, limit: Optional[int], after_id: Optional[int]) -> Select:
+    """Apply keyset pagination: rows with id > after_id, in id order"""
+    if after_id is not None:
+        statement = statement.where(id_column > after_id)
+    statement = statement.order_by(id_column)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
+
+
+def set_next_cursor(response: Response, items: List, limit: Optional[int]):
+    """Advertise the after_id for the next page when this page is full"""
+    if limit is not None and len(items) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = str(items[-1].id)
+
+
+def ndjson_response(
+    statement: Select, to_dicts: Callable[[Iterable[Any]], List[Dict[str, Any]]]
+) -> StreamingResponse:
+    """Stream query results as newline-delimited JSON
+
+    The generator owns its session because it outlives the request's
+    dependencies; rows are fetched in batches with yield_per and each batch
+    is encoded and written as it arrives, so the full result set is never
+    held in memory.
+    """
+    async def generate() -> AsyncIterator[bytes]:
+        async with ReadSessionLocal() as db:
+            result = await db.stream(statement.execution_options(yield_per=STREAM_BATCH_SIZE))
+            async for rows in result.partitions():
+                yield b"".join(orjson.dumps(item, option=JSON_OPTIONS) + b"\n" for item in to_dicts(rows))
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,370 @@
+import asyncio
+import math
+import threading
+from typing import Callable, Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+from .geo import (
+    EARTH_RADIUS_KM,
+    BoundingBox,
+    bounding_boxes,
+    corridor_boxes,
+    haversine_distance,
+    haversine_vector,
+    segment_distances,
+)
+
+# Status is stored as a small integer code next to the coordinates
+STATUS_CODES = {status: code for code, status in enumerate(models.PointStatus)}
+
+# Grid cell size (degrees) used to bucket points for nearest-neighbour search
+CELL_DEG = 0.1
+LNG_CELLS = int(round(360 / CELL_DEG))
+
+
+# (lat, lng, status code) of a point before and after a write; the "before"
+# side is None for inserts and the "after" side for removals. Listeners
+# receive None after a full reload.
+Position = Tuple[float, float, int]
+Change = Tuple[Optional[Position], Optional[Position]]
+Row = Tuple[int, float, float, models.PointStatus]
+Listener = Callable[[Optional[List[Change]]], None]
+
+
+def cell_of(lat: float, lng: float) -> Tuple[int, int]:
+    """Grid cell containing a coordinate"""
+    return int(math.floor(lat / CELL_DEG)), int(math.floor((lng + 180) / CELL_DEG)) % LNG_CELLS
+
+
+class PointIndex:
+    """In-memory snapshot of donation point coordinates
+
+    Holds contiguous float64 latitude/longitude arrays plus id and status
+    arrays, so radius queries are a single batched NumPy pass instead of a
+    per-row Python loop. Points are also bucketed into a lat/lng grid so
+    nearest-k queries only look at the rings of cells around the query.
+    Built from the donation_points table on first use and patched in place by
+    the write handlers. Derived structures (map tiles) subscribe to be told
+    which positions a write touched.
+
+    Writes reported while a load is reading the table are queued and replayed
+    on top of it once it finishes: the read may or may not have seen them.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._lock = threading.RLock()
+        self._load_lock = asyncio.Lock()
+        self._size = 0
+        self._slots = {}  # point id -> array position
+        self._cells = {}  # grid cell -> array positions
+        self._max_abs_lat = 0.0
+        self._listeners: List[Listener] = []
+        self._pending: Optional[list] = None  # writes reported mid-load
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.lats = np.zeros(capacity, dtype=np.float64)
+        self.lngs = np.zeros(capacity, dtype=np.float64)
+        self.statuses = np.zeros(capacity, dtype=np.int8)
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _reserve(self, capacity: int):
+        """Grow the backing arrays to hold at least `capacity` points"""
+        if capacity <= len(self.ids):
+            return
+        capacity = max(capacity, 2 * len(self.ids))
+        for name in ("ids", "lats", "lngs", "statuses"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[: self._size] = old[: self._size]
+            setattr(self, name, new)
+
+    @property
+    def loading(self) -> bool:
+        return self._pending is not None
+
+    async def load(self, db: AsyncSession):
+        """Rebuild the snapshot from the donation_points table"""
+        async with self._load_lock:
+            await self._load(db)
+
+    async def ensure_loaded(self, db: AsyncSession):
+        """Load the snapshot if this process hasn't built it yet"""
+        if not self.loaded:
+            async with self._load_lock:
+                if not self.loaded:
+                    await self._load(db)
+
+    async def _load(self, db: AsyncSession):
+        with self._lock:
+            self._pending = []
+        try:
+            result = await db.execute(
+                select(
+                    models.DonationPoint.id,
+                    models.DonationPoint.latitude,
+                    models.DonationPoint.longitude,
+                    models.DonationPoint.status,
+                )
+            )
+            rows = result.all()
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+        self.load_rows(rows)
+
+    def load_rows(self, rows: List[Row]):
+        """Replace the snapshot with the given (id, lat, lng, status) rows"""
+        with self._lock:
+            self._size = 0
+            self._slots = {}
+            self._cells = {}
+            self._max_abs_lat = 0.0
+            self._reserve(len(rows))
+            self._add_rows(rows)
+            # Writes reported during the read, in the order they were made
+            pending, self._pending = self._pending or [], None
+            for apply, args in pending:
+                apply(args)
+            self.loaded = True
+            self._notify(None)
+
+    def subscribe(self, listener: Listener):
+        """Call `listener` with the positions touched by every write"""
+        self._listeners.append(listener)
+
+    def _notify(self, changes: Optional[List[Change]]):
+        for listener in self._listeners:
+            listener(changes)
+
+    def _add_rows(self, rows: Iterable[Row]) -> List[Change]:
+        changes = []
+        for point_id, lat, lng, point_status in rows:
+            code = STATUS_CODES[models.PointStatus(point_status)]
+            slot = self._slots.get(point_id)
+            if slot is None:
+                self._reserve(self._size + 1)
+                slot = self._size
+                self._size += 1
+                self._slots[point_id] = slot
+                changes.append((None, (lat, lng, code)))
+            else:
+                old = (float(self.lats[slot]), float(self.lngs[slot]), int(self.statuses[slot]))
+                if old != (lat, lng, code):
+                    changes.append((old, (lat, lng, code)))
+                old_cell = cell_of(self.lats[slot], self.lngs[slot])
+                self._cells[old_cell].remove(slot)
+                if not self._cells[old_cell]:
+                    del self._cells[old_cell]
+            self._cells.setdefault(cell_of(lat, lng), []).append(slot)
+            self._max_abs_lat = max(self._max_abs_lat, abs(lat))
+            self.ids[slot] = point_id
+            self.lats[slot] = lat
+            self.lngs[slot] = lng
+            self.statuses[slot] = code
+        return changes
+
+    def _remove_ids(self, ids: Iterable[int]) -> List[Change]:
+        changes = []
+        for point_id in ids:
+            slot = self._slots.pop(point_id, None)
+            if slot is None:
+                continue
+            lat, lng = float(self.lats[slot]), float(self.lngs[slot])
+            changes.append(((lat, lng, int(self.statuses[slot])), None))
+            cell = cell_of(lat, lng)
+            self._cells[cell].remove(slot)
+            if not self._cells[cell]:
+                del self._cells[cell]
+            # Move the last point into the freed position
+            last = self._size - 1
+            if slot != last:
+                moved_cell = cell_of(self.lats[last], self.lngs[last])
+                slots = self._cells[moved_cell]
+                slots[slots.index(last)] = slot
+                self._slots[int(self.ids[last])] = slot
+                for name in ("ids", "lats", "lngs", "statuses"):
+                    array = getattr(self, name)
+                    array[slot] = array[last]
+            self._size = last
+        return changes
+
+    def _apply(self, write: Callable[[list], List[Change]], args: list):
+        """Apply a write now, or queue it if a load is reading the table"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((write, args))
+                return
+            if not self.loaded:
+                return  # Picked up by the initial load
+            changes = write(args)
+            if changes:
+                self._notify(changes)
+
+    def upsert(self, point: models.DonationPoint):
+        """Insert or refresh a single point after it was written"""
+        self._apply(self._add_rows, [(point.id, point.latitude, point.longitude, point.status)])
+
+    def upsert_many(self, rows: List[Row]):
+        """Insert or refresh a batch of (id, lat, lng, status) rows in one pass"""
+        if rows:
+            self._apply(self._add_rows, rows)
+
+    def remove_many(self, ids: List[int]):
+        """Drop deleted points"""
+        if ids:
+            self._apply(self._remove_ids, ids)
+
+    def within_radius(
+        self,
+        lat: float,
+        lng: float,
+        radius_km: float,
+        status: Optional[models.PointStatus] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Ids and distances of points within radius_km, nearest first"""
+        with self._lock:
+            n = self._size
+            lats = self.lats[:n]
+            lngs = self.lngs[:n]
+
+            # Cheap bounding-box mask before the trigonometry
+            mask = np.zeros(n, dtype=bool)
+            for min_lat, max_lat, min_lng, max_lng in bounding_boxes(lat, lng, radius_km):
+                mask |= (lats >= min_lat) & (lats <= max_lat) & (lngs >= min_lng) & (lngs <= max_lng)
+            if status is not None:
+                mask &= self.statuses[:n] == STATUS_CODES[status]
+            candidates = np.flatnonzero(mask)
+
+            distances = haversine_vector(lat, lng, lats[candidates], lngs[candidates])
+            inside = distances <= radius_km
+            candidates = candidates[inside]
+            distances = distances[inside]
+
+            order = np.argsort(distances, kind="stable")
+            return self.ids[candidates[order]], distances[order]
+
+    def _ring_slots(self, center: Tuple[int, int], ring: int) -> List[int]:
+        """Array positions of points in the cells exactly `ring` cells away"""
+        ci, cj = center
+        if ring == 0:
+            return list(self._cells.get(center, ()))
+        slots = []
+        for i in range(ci - ring, ci + ring + 1):
+            step = 1 if i in (ci - ring, ci + ring) else 2 * ring
+            for j in range(cj - ring, cj + ring + 1, step):
+                slots.extend(self._cells.get((i, j % LNG_CELLS), ()))
+        return slots
+
+    def _ring_min_km(self, lat: float, ring: int) -> float:
+        """Lower bound on the distance to any point outside the first `ring` rings"""
+        offset = math.radians(ring * CELL_DEG)
+        lat_bound = EARTH_RADIUS_KM * offset
+        # hav(d) >= cos(lat1) * cos(lat2) * hav(dlng) for any two points
+        scale = math.cos(math.radians(lat)) * math.cos(math.radians(min(self._max_abs_lat, 90.0)))
+        lng_bound = 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(max(scale, 0.0)) * math.sin(offset / 2)))
+        return min(lat_bound, lng_bound)
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        k: int,
+        status: Optional[models.PointStatus] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Ids and distances of the k points closest to (lat, lng), nearest first
+
+        Expands ring by ring around the query cell and stops once no unseen
+        cell can hold a point closer than the current k-th candidate, so the
+        cost tracks k and local density rather than table size.
+        """
+        with self._lock:
+            n = self._size
+            status_code = STATUS_CODES[status] if status is not None else None
+            center = cell_of(lat, lng)
+            found = np.empty(0, dtype=np.int64)
+            distances = np.empty(0, dtype=np.float64)
+            ring = 0
+            while True:
+                # Once the rings cover more cells than are occupied, a flat
+                # pass over every point is cheaper than walking empty cells
+                if (2 * ring + 1) ** 2 > 4 * len(self._cells) or 2 * ring + 1 >= LNG_CELLS:
+                    found = np.arange(n)
+                    distances = haversine_vector(lat, lng, self.lats[:n], self.lngs[:n])
+                    if status_code is not None:
+                        keep = self.statuses[:n] == status_code
+                        found, distances = found[keep], distances[keep]
+                    break
+
+                slots = np.asarray(self._ring_slots(center, ring), dtype=np.int64)
+                if status_code is not None and len(slots):
+                    slots = slots[self.statuses[slots] == status_code]
+                if len(slots):
+                    found = np.concatenate([found, slots])
+                    distances = np.concatenate(
+                        [distances, haversine_vector(lat, lng, self.lats[slots], self.lngs[slots])]
+                    )
+                if len(found) >= k:
+                    kth = np.partition(distances, k - 1)[k - 1]
+                    if kth <= self._ring_min_km(lat, ring):
+                        break
+                ring += 1
+
+            order = np.argsort(distances, kind="stable")[:k]
+            return self.ids[found[order]], distances[order]
+
+    def _slots_in_boxes(self, boxes: Iterable[BoundingBox]) -> np.ndarray:
+        """Array positions of points in grid cells overlapping any of the boxes"""
+        cells = set()
+        for min_lat, max_lat, min_lng, max_lng in boxes:
+            i_min, j_min = cell_of(min_lat, min_lng)
+            i_max, _ = cell_of(max_lat, max_lng)
+            j_span = int(math.floor((max_lng + 180) / CELL_DEG)) - int(math.floor((min_lng + 180) / CELL_DEG))
+            for i in range(i_min, i_max + 1):
+                for dj in range(j_span + 1):
+                    cells.add((i, (j_min + dj) % LNG_CELLS))
+        slots = [slot for cell in cells for slot in self._cells.get(cell, ())]
+        return np.asarray(slots, dtype=np.int64)
+
+    def along_route(
+        self,
+        path: List[Tuple[float, float]],
+        buffer_km: float,
+        status: Optional[models.PointStatus] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Points within buffer_km of a polyline, ordered by position along it
+
+        Returns (ids, route_km, distance_km): how far along the route each
+        point's closest approach lies and how far off the route it is.
+        Candidates come from the grid cells under each segment's corridor;
+        the exact point-to-segment test then runs once per segment over all
+        candidates as a vectorized pass.
+        """
+        with self._lock:
+            slots = self._slots_in_boxes(corridor_boxes(path, buffer_km))
+            if status is not None and len(slots):
+                slots = slots[self.statuses[slots] == STATUS_CODES[status]]
+            lats, lngs = self.lats[slots], self.lngs[slots]
+
+            best = np.full(len(slots), np.inf)
+            route_km = np.zeros(len(slots))
+            offset = 0.0
+            for (lat1, lng1), (lat2, lng2) in zip(path, path[1:]):
+                distance, along = segment_distances(lat1, lng1, lat2, lng2, lats, lngs)
+                closer = distance < best
+                best = np.where(closer, distance, best)
+                route_km = np.where(closer, offset + along, route_km)
+                offset += haversine_distance(lat1, lng1, lat2, lng2)
+
+            inside = best <= buffer_km
+            slots, route_km, best = slots[inside], route_km[inside], best[inside]
+            order = np.lexsort((best, route_km))
+            return self.ids[slots[order]], route_km[order], best[order]
+
+
+# Process-wide snapshot used by the donation point routes
+point_index = PointIndex()
@@ -1,30 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from .. import models, schemas, auth
-from ..database import get_db
+from ..cache import data_version
+from ..database import get_db, get_read_db
+from ..invalidation import CREATORS, bus
+from ..pagination import ndjson_response, paginate, set_next_cursor
+from ..serialization import CREATOR_COLUMNS, creator_dicts, creators_response
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
 
 @router.get("/creators", response_model=List[schemas.CreatorResponse])
-def list_all_creators(
-    db: Session = Depends(get_db),
+async def list_all_creators(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after_id: Optional[int] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_read_db),
     current_creator: models.Creator = Depends(auth.get_current_creator)
 ):
     """List all creators (admin endpoint - any authenticated user can access)"""
-    creators = db.query(models.Creator).all()
-    return creators
+    query = paginate(select(*CREATOR_COLUMNS), models.Creator.id, limit, after_id)
+    if format == "ndjson":
+        return ndjson_response(query, creator_dicts)
+    
+    creators = (await db.execute(query)).all()
+    response = creators_response(creators)
+    set_next_cursor(response, creators, limit)
+    return response
 
 
 @router.post("/creators/{creator_id}/verify", response_model=schemas.CreatorResponse)
-def verify_creator(
+async def verify_creator(
     creator_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_creator: models.Creator = Depends(auth.get_current_creator)
 ):
     """Verify a creator (admin endpoint - any authenticated user can verify others)"""
-    creator = db.query(models.Creator).filter(models.Creator.id == creator_id).first()
+    creator = await db.get(models.Creator, creator_id)
     if not creator:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -32,19 +46,22 @@ def verify_creator(
         )
     
     creator.verified = True
-    db.commit()
-    db.refresh(creator)
+    await db.commit()
+    await db.refresh(creator)
+    data_version.bump()
+    auth.principal_cache.invalidate(creator.id)
+    await bus.publish(CREATORS, [creator.id])
     return creator
 
 
 @router.post("/creators/{creator_id}/unverify", response_model=schemas.CreatorResponse)
-def unverify_creator(
+async def unverify_creator(
     creator_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_creator: models.Creator = Depends(auth.get_current_creator)
 ):
     """Unverify a creator (admin endpoint)"""
-    creator = db.query(models.Creator).filter(models.Creator.id == creator_id).first()
+    creator = await db.get(models.Creator, creator_id)
     if not creator:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -52,7 +69,10 @@ def unverify_creator(
         )
     
     creator.verified = False
-    db.commit()
-    db.refresh(creator)
+    await db.commit()
+    await db.refresh(creator)
+    data_version.bump()
+    auth.principal_cache.invalidate(creator.id)
+    await bus.publish(CREATORS, [creator.id])
     return creator
 
@@ -1,22 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from typing import List, Optional
-from google.oauth2 import id_token
-from google.auth.transport import requests
+import logging
 import os
-from .. import models, schemas, auth
-from ..database import get_db
+from .. import models, schemas, auth, google_auth
+from ..cache import data_version
+from ..database import get_db, get_read_db
+from ..invalidation import CREATORS, bus
+from ..pagination import ndjson_response, paginate, set_next_cursor
+from ..serialization import CREATOR_COLUMNS, creator_dicts, creators_response
+from ..search import creators_fts, match_expression, ranked
 
 router = APIRouter(prefix="/api/creators", tags=["creators"])
 
+logger = logging.getLogger(__name__)
+
 # Google OAuth Client ID (set via environment variable)
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "")
 
 
 @router.post("/login", response_model=schemas.Token)
-def login_with_google(google_login: schemas.GoogleLogin, db: Session = Depends(get_db)):
+async def login_with_google(google_login: schemas.GoogleLogin, db: AsyncSession = Depends(get_db)):
     """Login/Register creator with Google OAuth token"""
     if not GOOGLE_CLIENT_ID:
         raise HTTPException(
@@ -25,61 +31,8 @@ def login_with_google(google_login: schemas.GoogleLogin, db: Session = Depends(g
         )
     
     try:
-        # Verify Google ID token
-        idinfo = id_token.verify_oauth2_token(
-            google_login.id_token, requests.Request(), GOOGLE_CLIENT_ID
-        )
-        
-        # Extract user info from Google token
-        google_id = idinfo.get("sub")
-        email = idinfo.get("email")
-        name = idinfo.get("name", email.split("@")[0])  # Fallback to email username if no name
-        
-        if not email:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email not provided by Google"
-            )
-        
-        # Check if creator exists by email or google_id
-        creator = db.query(models.Creator).filter(
-            (models.Creator.email == email) | (models.Creator.google_id == google_id)
-        ).first()
-        
-        if creator:
-            # Update google_id if not set
-            if not creator.google_id:
-                creator.google_id = google_id
-            # Auto-verify authenticated users
-            if not creator.verified:
-                creator.verified = True
-            db.commit()
-            db.refresh(creator)
-        else:
-            # Create new creator - auto-verify authenticated users
-            creator = models.Creator(
-                name=name,
-                email=email,
-                google_id=google_id,
-                password_hash=None,  # No password for Google OAuth users
-                verified=True  # Auto-verify on registration
-            )
-            db.add(creator)
-            db.commit()
-            db.refresh(creator)
-        
-        # Generate JWT token
-        access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
-        # JWT requires 'sub' to be a string, so convert creator_id to string
-        creator_id = str(creator.id)
-        print(f"[LOGIN DEBUG] Creating token for creator_id: {creator_id}, type: {type(creator_id)}")
-        print(f"[LOGIN DEBUG] Creator details: id={creator.id}, email={creator.email}, name={creator.name}")
-        access_token = auth.create_access_token(
-            data={"sub": creator_id}, expires_delta=access_token_expires
-        )
-        print(f"[LOGIN DEBUG] Token created: {access_token[:50]}...")
-        return {"access_token": access_token, "token_type": "bearer"}
-        
+        # Verify Google ID token on the verification pool
+        idinfo = await google_auth.verify_id_token_async(google_login.id_token, GOOGLE_CLIENT_ID)
     except ValueError as e:
         # Invalid token
         raise HTTPException(
@@ -87,17 +40,85 @@ def login_with_google(google_login: schemas.GoogleLogin, db: Session = Depends(g
             detail=f"Invalid Google token: {str(e)}",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    except google_auth.CertificatesUnavailable:
+        logger.exception("Could not fetch Google signing certificates")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Could not reach Google to verify the token"
+        )
+    
+    return await _login_creator(db, idinfo)
+
+
+async def _login_creator(db: AsyncSession, idinfo: dict) -> dict:
+    """Find or register the creator behind verified Google claims and issue a JWT"""
+    # Extract user info from Google token
+    google_id = idinfo.get("sub")
+    email = idinfo.get("email")
+    
+    if not email:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email not provided by Google"
+        )
+    name = idinfo.get("name", email.split("@")[0])  # Fallback to email username if no name
+    
+    # Check if creator exists by email or google_id
+    creator = (await db.scalars(
+        select(models.Creator).where(
+            (models.Creator.email == email) | (models.Creator.google_id == google_id)
+        )
+    )).first()
+    
+    if creator:
+        changed = False
+        # Update google_id if not set
+        if not creator.google_id:
+            creator.google_id = google_id
+            changed = True
+        # Auto-verify authenticated users
+        if not creator.verified:
+            creator.verified = True
+            changed = True
+        # A returning creator usually changes nothing; leave the caches alone then
+        if changed:
+            await db.commit()
+            await db.refresh(creator)
+            data_version.bump()
+            auth.principal_cache.invalidate(creator.id)
+            await bus.publish(CREATORS, [creator.id])
+    else:
+        # Create new creator - auto-verify authenticated users
+        creator = models.Creator(
+            name=name,
+            email=email,
+            google_id=google_id,
+            password_hash=None,  # No password for Google OAuth users
+            verified=True  # Auto-verify on registration
+        )
+        db.add(creator)
+        await db.commit()
+        await db.refresh(creator)
+    
+    # Generate JWT token
+    access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
+    # JWT requires 'sub' to be a string, so convert creator_id to string
+    access_token = auth.create_access_token(
+        data={"sub": str(creator.id)}, expires_delta=access_token_expires
+    )
+    logger.info("Issued access token for creator_id=%s", creator.id)
+    return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.post("/{creator_id}/verify", response_model=schemas.CreatorResponse)
-def verify_creator(
+async def verify_creator(
     creator_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_creator: models.Creator = Depends(auth.get_current_creator)
 ):
     """Verify a creator (admin endpoint - for MVP, any authenticated creator can verify others)"""
     # In production, add admin role check here
-    creator = db.query(models.Creator).filter(models.Creator.id == creator_id).first()
+    creator = await db.get(models.Creator, creator_id)
     if not creator:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -105,32 +126,42 @@ def verify_creator(
         )
     
     creator.verified = True
-    db.commit()
-    db.refresh(creator)
+    await db.commit()
+    await db.refresh(creator)
+    data_version.bump()
+    auth.principal_cache.invalidate(creator.id)
+    await bus.publish(CREATORS, [creator.id])
     return creator
 
 
 @router.get("/me", response_model=schemas.CreatorResponse)
-def get_current_creator_info(
+async def get_current_creator_info(
     current_creator: models.Creator = Depends(auth.get_current_creator)
 ):
     """Get current authenticated creator information"""
-    print(f"[ME DEBUG] Current creator: id={current_creator.id}, email={current_creator.email}")
     return current_creator
 
 
 @router.get("", response_model=List[schemas.CreatorResponse])
-def list_creators(
-    search: Optional[str] = None,
+async def list_creators(
+    q: Optional[str] = None,
+    search: Optional[str] = Query(None, deprecated=True),
     verified: Optional[bool] = None,
-    db: Session = Depends(get_db)
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after_id: Optional[int] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """List all creators with optional search and filter"""
-    query = db.query(models.Creator)
+    """List all creators with optional search and filter
+    
+    `q` matches words by prefix against name and email, best matches first
+    (100 unless `limit` says otherwise).
+    """
+    query = select(*CREATOR_COLUMNS)
     
-    # Search by name or email
+    # Substring search by name or email (superseded by q)
     if search:
-        query = query.filter(
+        query = query.where(
             or_(
                 models.Creator.name.ilike(f"%{search}%"),
                 models.Creator.email.ilike(f"%{search}%")
@@ -139,16 +170,27 @@ def list_creators(
     
     # Filter by verified status
     if verified is not None:
-        query = query.filter(models.Creator.verified == verified)
+        query = query.where(models.Creator.verified == verified)
     
-    creators = query.all()
-    return creators
+    expression = match_expression(q)
+    if expression:
+        query = ranked(query, models.Creator.id, creators_fts, expression, limit)
+    else:
+        query = paginate(query, models.Creator.id, limit, after_id)
+    if format == "ndjson":
+        return ndjson_response(query, creator_dicts)
+    
+    creators = (await db.execute(query)).all()
+    response = creators_response(creators)
+    if not expression:
+        set_next_cursor(response, creators, limit)
+    return response
 
 
 @router.get("/{creator_id}", response_model=schemas.CreatorResponse)
-def get_creator(creator_id: int, db: Session = Depends(get_db)):
+async def get_creator(creator_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get a single creator by ID"""
-    creator = db.query(models.Creator).filter(models.Creator.id == creator_id).first()
+    creator = await db.get(models.Creator, creator_id)
     if not creator:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -158,14 +200,14 @@ def get_creator(creator_id: int, db: Session = Depends(get_db)):
 
 
 @router.patch("/{creator_id}", response_model=schemas.CreatorResponse)
-def update_creator(
+async def update_creator(
     creator_id: int,
     creator_update: schemas.CreatorUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_creator: models.Creator = Depends(auth.get_current_creator)
 ):
     """Update a creator (only themselves)"""
-    creator = db.query(models.Creator).filter(models.Creator.id == creator_id).first()
+    creator = await db.get(models.Creator, creator_id)
     if not creator:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -184,10 +226,12 @@ def update_creator(
         creator.name = creator_update.name
     if creator_update.email is not None:
         # Check if email already exists (and not owned by this creator)
-        existing_creator = db.query(models.Creator).filter(
-            models.Creator.email == creator_update.email,
-            models.Creator.id != creator_id
-        ).first()
+        existing_creator = (await db.scalars(
+            select(models.Creator).where(
+                models.Creator.email == creator_update.email,
+                models.Creator.id != creator_id
+            )
+        )).first()
         if existing_creator:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -195,19 +239,22 @@ def update_creator(
             )
         creator.email = creator_update.email
     
-    db.commit()
-    db.refresh(creator)
+    await db.commit()
+    await db.refresh(creator)
+    data_version.bump()
+    auth.principal_cache.invalidate(creator.id)
+    await bus.publish(CREATORS, [creator.id])
     return creator
 
 
 @router.delete("/{creator_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_creator(
+async def delete_creator(
     creator_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_creator: models.Creator = Depends(auth.get_current_creator)
 ):
     """Delete a creator (only themselves)"""
-    creator = db.query(models.Creator).filter(models.Creator.id == creator_id).first()
+    creator = await db.get(models.Creator, creator_id)
     if not creator:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -222,9 +269,11 @@ def delete_creator(
         )
     
     # Check if creator has donation points
-    donation_points = db.query(models.DonationPoint).filter(
-        models.DonationPoint.creator_id == creator_id
-    ).count()
+    donation_points = await db.scalar(
+        select(func.count()).select_from(models.DonationPoint).where(
+            models.DonationPoint.creator_id == creator_id
+        )
+    )
     
     if donation_points > 0:
         raise HTTPException(
@@ -232,7 +281,10 @@ def delete_creator(
             detail="Cannot delete creator with existing donation points"
         )
     
-    db.delete(creator)
-    db.commit()
+    await db.delete(creator)
+    await db.commit()
+    data_version.bump()
+    auth.principal_cache.invalidate(creator_id)
+    await bus.publish(CREATORS, [creator_id])
     return None
 
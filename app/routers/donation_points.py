@@ -1,32 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Form
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status, Form
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Row, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-import math
 from datetime import datetime
-from .. import models, schemas, auth
-from ..database import get_db
+import orjson
+from .. import models, schemas, auth, bulk, search
+from ..changes import DELETE, point_changes
+from ..cache import data_version
+from ..database import get_db, get_read_db
+from ..geo import MAX_ROUTE_KM, path_length
+from ..invalidation import POINTS, bus
+from ..live import Subscriber, broadcaster, event_stream
+from ..pagination import ndjson_response, paginate, set_next_cursor
+from ..point_index import point_index
+from ..serialization import (
+    POINT_COLUMNS, PreparedJSONResponse, columnar_response, point_dicts, points_response, wants_columnar
+)
+from ..tiles import (
+    DENSITY_MAX_CELLS, MAX_CLUSTER_ZOOM, MAX_DENSITY_RESOLUTION, MAX_ZOOM, MIN_DENSITY_RESOLUTION,
+    density_cell_count, density_resolution, tile_index
+)
 
 router = APIRouter(prefix="/api/donation-points", tags=["donation-points"])
 
 
-
-def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculate distance between two points in kilometers using Haversine formula"""
-    R = 6371  # Earth radius in kilometers
-    
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
+async def get_points_by_ids(db: AsyncSession, ids, *criteria) -> List[Row]:
+    """Load donation points as plain rows by id, preserving the order of `ids`
     
-    a = (
-        math.sin(dlat / 2) ** 2
-        + math.cos(math.radians(lat1))
-        * math.cos(math.radians(lat2))
-        * math.sin(dlon / 2) ** 2
+    The ids go in as one JSON array parameter and are joined through
+    json_each, so any number of them costs a single statement. Extra
+    `criteria` are applied in the same statement, so points they exclude
+    are simply dropped from the result.
+    """
+    if not len(ids):
+        return []
+    id_list = orjson.dumps([int(point_id) for point_id in ids]).decode()
+    wanted = func.json_each(id_list).table_valued("key", "value")
+    result = await db.execute(
+        select(*POINT_COLUMNS)
+        .select_from(wanted)
+        .join(models.DonationPoint, models.DonationPoint.id == wanted.c.value)
+        .where(*criteria)
+        .order_by(wanted.c.key)
     )
-    c = 2 * math.asin(math.sqrt(a))
-    
-    return R * c
+    return result.all()
+
+
+def status_criterion(point_status: models.PointStatus):
+    """Status filter with the value inlined, so SQLite can use the partial index"""
+    column = models.DonationPoint.status
+    return column == literal(point_status, column.type, literal_execute=True)
 
 
 @router.post("", response_model=schemas.DonationPointResponse, status_code=status.HTTP_201_CREATED)
@@ -38,7 +62,7 @@ async def create_donation_point(
     description: Optional[str] = Form(None),
     start_date: Optional[datetime] = Form(None),
     end_date: Optional[datetime] = Form(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_creator: models.Creator = Depends(auth.get_current_creator)
 ):
     """Create a new donation point (requires authenticated creator)"""
@@ -58,17 +82,63 @@ async def create_donation_point(
         description=description,
         start_date=start_date,
         end_date=end_date,
-        status=models.PointStatus.ONGOING
+        status=models.PointStatus.ONGOING,
+        creator_verified=models.creator_verified_of(current_creator.id)
     )
     db.add(db_point)
-    db.commit()
-    db.refresh(db_point)
+    await db.commit()
+    await db.refresh(db_point)
+    point_index.upsert(db_point)
+    data_version.bump()
+    await bus.publish(POINTS, [db_point.id])
+    
+    return db_point
+
+
+@router.post("/bulk", response_model=schemas.BulkImportResult)
+async def bulk_create_donation_points(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_creator: models.Creator = Depends(auth.get_current_creator)
+):
+    """Create many donation points at once (requires authenticated creator)
+    
+    Accepts a JSON array, NDJSON or CSV body, or a multipart upload with a
+    `file` field. Rows are validated as a batch and invalid ones are reported
+    by position without aborting the rest.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Missing 'file' upload")
+        content = await upload.read()
+        format = bulk.detect_format(upload.content_type, upload.filename)
+    else:
+        content = await request.body()
+        format = bulk.detect_format(content_type)
+    
+    if format is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Upload must be JSON, NDJSON or CSV"
+        )
+    try:
+        raw_rows = bulk.parse_rows(content, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse upload: {e}")
     
-    return schemas.DonationPointResponse.model_validate(db_point)
+    result = await bulk.import_points(db, current_creator.id, raw_rows)
+    if result.created:
+        data_version.bump()
+    return result
 
 
 @router.get("", response_model=List[schemas.DonationPointResponse])
-def search_donation_points(
+async def search_donation_points(
+    request: Request,
+    q: Optional[str] = None,
     lat: Optional[float] = None,
     lng: Optional[float] = None,
     radius: Optional[float] = 10.0,
@@ -76,69 +146,274 @@ def search_donation_points(
     start_lng: Optional[float] = None,
     end_lat: Optional[float] = None,
     end_lng: Optional[float] = None,
-    db: Session = Depends(get_db)
+    buffer_km: float = Query(5.0, gt=0, le=100.0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after_id: Optional[int] = None,
+    format: str = Query("json", pattern="^(json|ndjson|columnar)$"),
+    status_filter: models.StatusFilter = Query(models.StatusFilter.ONGOING, alias="status"),
+    creator_verified: Optional[bool] = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Search donation points by GPS location or route"""
-    query = db.query(models.DonationPoint)
+    """Search donation points by GPS location, route and/or text
+    
+    `q` matches words by prefix against organization name, address and
+    description. Combined with a location or route it narrows those results,
+    which keep their distance order; on its own results are ranked by
+    relevance, 100 of them unless `limit` says otherwise. Without search
+    params, lists points in id order; `limit`/`after_id` page through them
+    and `format=ndjson` streams the listing. Only ongoing points are returned
+    unless `status` says otherwise; `creator_verified` keeps only points by
+    verified (or unverified) creators.
+    
+    Map clients can ask for a compact columnar layout (id, coordinates,
+    status and name only) with `Accept: application/vnd.donation-points.columnar+json`
+    or `format=columnar`.
+    """
+    render = points_response
+    if wants_columnar(request.headers.get("accept", ""), format):
+        render = columnar_response
+    query = select(*POINT_COLUMNS)
+    page_limit = None  # Only the plain listing is cursor-paginated
+    point_status = status_filter.point_status()
+    if point_status is not None:
+        query = query.where(status_criterion(point_status))
+    expression = search.match_expression(q)
+    criteria = []
+    if creator_verified is not None:
+        # Answered from the denormalized flag, no join to creators
+        verified_criterion = models.DonationPoint.creator_verified == creator_verified
+        query = query.where(verified_criterion)
+        criteria.append(verified_criterion)
     
     # GPS-based search (current location with radius)
     if lat is not None and lng is not None:
-        # Get all points and filter by distance
-        all_points = query.all()
-        filtered_points = []
-        for point in all_points:
-            distance = haversine_distance(lat, lng, point.latitude, point.longitude)
-            if distance <= radius:
-                filtered_points.append(point)
-        query = db.query(models.DonationPoint).filter(
-            models.DonationPoint.id.in_([p.id for p in filtered_points])
-        )
+        # One vectorized haversine pass over the in-memory coordinate
+        # snapshot, then load the matching rows nearest first
+        await point_index.ensure_loaded(db)
+        ids, _ = point_index.within_radius(lat, lng, radius, status=point_status)
+        if expression:
+            ids = await search.matching_ids(db, search.points_fts, expression, ids)
+        points = await get_points_by_ids(db, ids, *criteria)
     
-    # Route-based search (bounding box)
+    # Route-based search (corridor around the straight start-end route)
     elif all([start_lat is not None, start_lng is not None, end_lat is not None, end_lng is not None]):
-        min_lat = min(start_lat, end_lat)
-        max_lat = max(start_lat, end_lat)
-        min_lng = min(start_lng, end_lng)
-        max_lng = max(start_lng, end_lng)
-        
-        query = query.filter(
-            and_(
-                models.DonationPoint.latitude >= min_lat,
-                models.DonationPoint.latitude <= max_lat,
-                models.DonationPoint.longitude >= min_lng,
-                models.DonationPoint.longitude <= max_lng
-            )
+        path = [(start_lat, start_lng), (end_lat, end_lng)]
+        if path_length(path) > MAX_ROUTE_KM:
+            raise HTTPException(status_code=422, detail=f"Route must not be longer than {MAX_ROUTE_KM:g} km")
+        await point_index.ensure_loaded(db)
+        ids, _, _ = point_index.along_route(path, buffer_km, status=point_status)
+        if expression:
+            ids = await search.matching_ids(db, search.points_fts, expression, ids)
+        points = await get_points_by_ids(db, ids, *criteria)
+    
+    # Text-only search, best matches first
+    elif expression:
+        query = search.ranked(query, models.DonationPoint.id, search.points_fts, expression, limit)
+        if format == "ndjson":
+            return ndjson_response(query, point_dicts)
+        points = (await db.execute(query)).all()
+    
+    # If no search params, list points page by page
+    else:
+        query = paginate(query, models.DonationPoint.id, limit, after_id)
+        if format == "ndjson":
+            return ndjson_response(query, point_dicts)
+        points = (await db.execute(query)).all()
+        page_limit = limit
+    
+    response = render(points)
+    set_next_cursor(response, points, page_limit)
+    # Representation depends on Accept, so shared caches must key on it
+    response.headers["Vary"] = "Accept"
+    return response
+
+
+@router.get("/nearest", response_model=List[schemas.NearbyDonationPoint])
+async def nearest_donation_points(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    k: int = Query(20, ge=1, le=500),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get the k ongoing donation points closest to a location, nearest first"""
+    await point_index.ensure_loaded(db)
+    ids, distances = point_index.nearest(lat, lng, k, status=models.PointStatus.ONGOING)
+    distance_by_id = dict(zip(ids.tolist(), distances.tolist()))
+    
+    items = point_dicts(await get_points_by_ids(db, ids))
+    for item in items:
+        item["distance_km"] = distance_by_id[item["id"]]
+    return PreparedJSONResponse(items)
+
+
+@router.get("/changes", response_model=schemas.PointChangeFeed)
+async def get_point_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get points inserted, updated or deleted after change sequence `since`
+    
+    Start from 0 for a full snapshot, then pass back `cursor` to receive only
+    what changed; repeat while `has_more`. Each point appears once, with its
+    current state, or as a tombstone if it was deleted.
+    """
+    query = (
+        select(point_changes.c.seq, point_changes.c.op, point_changes.c.point_id, *POINT_COLUMNS)
+        .select_from(point_changes)
+        .outerjoin(models.DonationPoint, models.DonationPoint.id == point_changes.c.point_id)
+        .where(point_changes.c.seq > since)
+        .order_by(point_changes.c.seq)
+        .limit(limit + 1)
+    )
+    rows = (await db.execute(query)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    points = iter(point_dicts(row for row in rows if row.op != DELETE))
+    changes = [
+        {
+            "seq": row.seq,
+            "op": row.op,
+            "id": row.point_id,
+            "point": None if row.op == DELETE else next(points),
+        }
+        for row in rows
+    ]
+    return PreparedJSONResponse({
+        "changes": changes,
+        "cursor": rows[-1].seq if rows else since,
+        "has_more": has_more,
+    })
+
+
+@router.get("/live", response_class=StreamingResponse)
+async def live_point_events(
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lng: Optional[float] = Query(None, ge=-180, le=180),
+    max_lng: Optional[float] = Query(None, ge=-180, le=180),
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID")
+):
+    """Server-sent events for point creates, updates, ends and deletes
+    
+    Pass all four bounds to only hear about points inside that box
+    (min_lng > max_lng wraps across the antimeridian). Event ids are change
+    sequences, so a reconnecting EventSource picks up where it left off; a
+    `resync` event means the client fell behind and should catch up through
+    /changes.
+    """
+    bounds = [min_lat, max_lat, min_lng, max_lng]
+    if any(bound is not None for bound in bounds) and None in bounds:
+        raise HTTPException(status_code=400, detail="Pass all of min_lat, max_lat, min_lng and max_lng")
+    if min_lat is not None and min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="min_lat must not exceed max_lat")
+    
+    subscriber = Subscriber(tuple(bounds) if min_lat is not None else None)
+    live_from = await broadcaster.subscribe(subscriber)
+    return StreamingResponse(
+        event_stream(subscriber, live_from, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/route", response_model=List[schemas.RouteDonationPoint])
+async def search_along_route(route: schemas.RouteSearch, db: AsyncSession = Depends(get_read_db)):
+    """Search donation points within a corridor around a multi-waypoint route"""
+    await point_index.ensure_loaded(db)
+    ids, route_km, distances = point_index.along_route(
+        route.path(), route.buffer_km, status=route.status.point_status()
+    )
+    position_by_id = dict(zip(ids.tolist(), zip(route_km.tolist(), distances.tolist())))
+    
+    items = point_dicts(await get_points_by_ids(db, ids))
+    for item in items:
+        item["route_km"], item["distance_km"] = position_by_id[item["id"]]
+    return PreparedJSONResponse(items)
+
+
+@router.get("/tiles/{z}/{x}/{y}", response_model=schemas.MapTile)
+async def get_map_tile(z: int, x: int, y: int, db: AsyncSession = Depends(get_read_db)):
+    """Get the ongoing donation points in a slippy-map tile
+    
+    Up to MAX_CLUSTER_ZOOM the tile holds server-side clusters; beyond it,
+    the individual points.
+    """
+    if not (0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tile not found"
         )
     
-    # If no search params, return all points
-    points = query.all()
+    await point_index.ensure_loaded(db)
+    if z <= MAX_CLUSTER_ZOOM:
+        return tile_index.clusters(z, x, y)
     
-    # Format response
-    return [schemas.DonationPointResponse.model_validate(point) for point in points]
+    points = await get_points_by_ids(db, tile_index.point_ids(z, x, y))
+    return PreparedJSONResponse({"z": z, "x": x, "y": y, "clusters": [], "points": point_dicts(points)})
+
+
+@router.get("/density", response_model=schemas.DensityGrid)
+async def get_point_density(
+    bbox: str = Query(..., description="min_lat,min_lng,max_lat,max_lng"),
+    resolution: Optional[int] = Query(None, ge=MIN_DENSITY_RESOLUTION, le=MAX_DENSITY_RESOLUTION),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get the density of ongoing donation points on a grid over a bounding box
+
+    Cells are slippy-map tiles at zoom `resolution` (chosen from the bbox
+    when omitted), counted from aggregates kept up to date on every write,
+    so the cost depends on the number of cells, not points. min_lng > max_lng
+    wraps across the antimeridian.
+    """
+    try:
+        min_lat, min_lng, max_lat, max_lng = (float(value) for value in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be min_lat,min_lng,max_lat,max_lng")
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= 180 and -180 <= max_lng <= 180):
+        raise HTTPException(status_code=400, detail="bbox is out of range")
+
+    box = (min_lat, max_lat, min_lng, max_lng)
+    if resolution is None:
+        resolution = density_resolution(box)
+    elif density_cell_count(box, resolution) > DENSITY_MAX_CELLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"bbox spans more than {DENSITY_MAX_CELLS} cells at resolution {resolution}"
+        )
+
+    await point_index.ensure_loaded(db)
+    cells = tile_index.density(resolution, box)
+    return PreparedJSONResponse({
+        "resolution": resolution,
+        "total": sum(cell["count"] for cell in cells),
+        "cells": cells,
+    })
 
 
 @router.get("/{point_id}", response_model=schemas.DonationPointResponse)
-def get_donation_point(point_id: int, db: Session = Depends(get_db)):
+async def get_donation_point(point_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get a single donation point by ID"""
-    point = db.query(models.DonationPoint).filter(models.DonationPoint.id == point_id).first()
+    point = await db.get(models.DonationPoint, point_id)
     if not point:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Donation point not found"
         )
     
-    return schemas.DonationPointResponse.model_validate(point)
+    return point
 
 
 @router.patch("/{point_id}", response_model=schemas.DonationPointResponse)
-def update_donation_point(
+async def update_donation_point(
     point_id: int,
     point_update: schemas.DonationPointUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_creator: models.Creator = Depends(auth.get_current_creator)
 ):
     """Update a donation point (only by its creator)"""
-    point = db.query(models.DonationPoint).filter(models.DonationPoint.id == point_id).first()
+    point = await db.get(models.DonationPoint, point_id)
     if not point:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -160,10 +435,13 @@ def update_donation_point(
     if point_update.end_date is not None:
         point.end_date = point_update.end_date
     
-    db.commit()
-    db.refresh(point)
+    await db.commit()
+    await db.refresh(point)
+    point_index.upsert(point)
+    data_version.bump()
+    await bus.publish(POINTS, [point.id])
     
-    return schemas.DonationPointResponse.model_validate(point)
+    return point
 
 
 
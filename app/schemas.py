@@ -1,7 +1,8 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, model_validator
 from typing import Optional, List
 from datetime import datetime
-from .models import PointStatus
+from .geo import MAX_ROUTE_KM, path_length
+from .models import PointStatus, StatusFilter
 
 
 # Creator Schemas
@@ -57,6 +58,7 @@ class DonationPointUpdate(BaseModel):
 class DonationPointResponse(DonationPointBase):
     id: int
     creator_id: int
+    creator_verified: bool
     status: PointStatus
     created_at: datetime
 
@@ -64,6 +66,70 @@ class DonationPointResponse(DonationPointBase):
         from_attributes = True
 
 
+class NearbyDonationPoint(DonationPointResponse):
+    distance_km: float
+
+
+class RouteDonationPoint(DonationPointResponse):
+    route_km: float  # Position of the closest approach along the route
+    distance_km: float  # Distance from the route
+
+
+class PointChange(BaseModel):
+    seq: int
+    op: str  # "upsert" or "delete"
+    id: int
+    point: Optional[DonationPointResponse] = None  # Current state; None for deletes
+
+
+class PointChangeFeed(BaseModel):
+    changes: List[PointChange]
+    cursor: int  # Pass back as `since` on the next sync
+    has_more: bool
+
+
+class BulkRowError(BaseModel):
+    row: int  # Zero-based position in the upload
+    errors: List[str]
+
+
+class BulkImportResult(BaseModel):
+    created: int
+    ids: List[int]
+    errors: List[BulkRowError]
+
+
+# Map Tile Schemas
+class PointCluster(BaseModel):
+    count: int
+    latitude: float  # Centroid
+    longitude: float
+    bounds: List[float]  # [min_lat, min_lng, max_lat, max_lng]
+    point_id: Optional[int] = None  # Set when the cluster is a single point
+
+
+class MapTile(BaseModel):
+    z: int
+    x: int
+    y: int
+    clusters: List[PointCluster] = []
+    points: List[DonationPointResponse] = []
+
+
+class DensityCell(BaseModel):
+    x: int  # Slippy-map tile column at the grid's resolution
+    y: int
+    count: int
+    latitude: float  # Centroid of the cell's points
+    longitude: float
+
+
+class DensityGrid(BaseModel):
+    resolution: int
+    total: int
+    cells: List[DensityCell] = []
+
+
 # Search Schemas
 class GPSSearch(BaseModel):
     lat: float = Field(..., ge=-90, le=90)
@@ -71,9 +137,31 @@ class GPSSearch(BaseModel):
     radius: float = Field(default=10.0, ge=0.1, le=1000.0)  # km
 
 
+class Coordinate(BaseModel):
+    lat: float = Field(..., ge=-90, le=90)
+    lng: float = Field(..., ge=-180, le=180)
+
+
 class RouteSearch(BaseModel):
     start_lat: float = Field(..., ge=-90, le=90)
     start_lng: float = Field(..., ge=-180, le=180)
     end_lat: float = Field(..., ge=-90, le=90)
     end_lng: float = Field(..., ge=-180, le=180)
+    waypoints: List[Coordinate] = Field(default_factory=list, max_length=1000)  # Between start and end
+    buffer_km: float = Field(default=5.0, gt=0, le=100.0)  # Corridor half-width
+    status: StatusFilter = StatusFilter.ONGOING
+
+    def path(self) -> List[tuple]:
+        """Route as (lat, lng) pairs from start to end"""
+        return (
+            [(self.start_lat, self.start_lng)]
+            + [(point.lat, point.lng) for point in self.waypoints]
+            + [(self.end_lat, self.end_lng)]
+        )
+
+    @model_validator(mode="after")
+    def check_length(self):
+        if path_length(self.path()) > MAX_ROUTE_KM:
+            raise ValueError(f"Route must not be longer than {MAX_ROUTE_KM:g} km")
+        return self
 
@@ -0,0 +1,82 @@
+import os
+import re
+from typing import Optional
+import numpy as np
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import column, table
+
+# FTS5 indexes over donation point and creator text. Both are external-content
+# tables kept in sync by triggers (migration 2), so they store only the
+# index, not a copy.
+POINTS_FTS = "donation_points_fts"
+CREATORS_FTS = "creators_fts"
+
+points_fts = table(POINTS_FTS, column("rowid"), column("rank"))
+creators_fts = table(CREATORS_FTS, column("rowid"), column("rank"))
+
+# Ranked searches score at most this many matches, the most recently added
+# first. bm25 costs the same for every match, so a word found in most rows
+# would otherwise score the whole table on each request.
+SEARCH_RANK_WINDOW = int(os.getenv("SEARCH_RANK_WINDOW", "5000"))
+# Results of a ranked search when the request gives no limit
+SEARCH_DEFAULT_LIMIT = 100
+
+
+def match_expression(q: Optional[str]) -> Optional[str]:
+    """Turn free text into an FTS5 query: every word must match as a prefix"""
+    if not q:
+        return None
+    words = re.findall(r"\w+", q)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def matches(fts_table, expression: str):
+    """WHERE clause for rows of an FTS table matching an expression"""
+    return literal_column(fts_table.name).op("MATCH")(expression)
+
+
+async def matching_ids(db: AsyncSession, fts_table, expression: str, ids: np.ndarray) -> np.ndarray:
+    """The subset of `ids` whose text matches an expression, in their original order
+
+    Runs the MATCH once, restricted to the rowid range of `ids`, instead of
+    as a subquery that SQLite would rebuild for every statement it appears in.
+    """
+    if not len(ids):
+        return ids
+    # One comma-separated row: a row per match would cost more than the
+    # MATCH itself when a word is in most points
+    found = (await db.execute(
+        select(func.group_concat(fts_table.c.rowid)).where(
+            matches(fts_table, expression),
+            fts_table.c.rowid >= int(ids.min()),
+            fts_table.c.rowid <= int(ids.max()),
+        )
+    )).scalar()
+    if found is None:
+        return ids[:0]
+    return ids[np.isin(ids, np.array(found.split(","), dtype=np.int64))]
+
+
+def ranked(statement, id_column, fts_table, expression: str, limit: Optional[int]):
+    """Restrict a query to matching rows, best bm25 rank first
+
+    Only the newest SEARCH_RANK_WINDOW matches are scored; below that many
+    matches the ranking is exact. The statement's filters are applied before
+    the window is cut, so rows they exclude don't use up the window.
+    """
+    window = (
+        select(fts_table.c.rowid.label("id"), fts_table.c.rank)
+        .join_from(fts_table, id_column.table, id_column == fts_table.c.rowid)
+        .where(matches(fts_table, expression))
+    )
+    if statement.whereclause is not None:
+        window = window.where(statement.whereclause)
+    window = window.order_by(fts_table.c.rowid.desc()).limit(SEARCH_RANK_WINDOW).subquery()
+    return (
+        statement.join(window, window.c.id == id_column)
+        .order_by(window.c.rank, id_column)
+        .limit(limit or SEARCH_DEFAULT_LIMIT)
+    )
@@ -0,0 +1,110 @@
+import time
+from operator import attrgetter
+from typing import Any, Dict, Iterable, List, Sequence
+import orjson
+from fastapi import Response
+from sqlalchemy import Row
+from . import models, schemas
+from .metrics import record_rows, record_serialization
+
+# Response schemas stay the documented contract (they are still declared as
+# each route's response_model); these field lists are what actually gets
+# written, straight from the row, without a second round of validation
+POINT_FIELDS = tuple(schemas.DonationPointResponse.model_fields)
+CREATOR_FIELDS = tuple(schemas.CreatorResponse.model_fields)
+
+# Columns to select when reading points as plain rows instead of ORM objects
+POINT_COLUMNS = [getattr(models.DonationPoint, field) for field in POINT_FIELDS]
+CREATOR_COLUMNS = [getattr(models.Creator, field) for field in CREATOR_FIELDS]
+
+# Datetimes are read back as aware UTC; write them with a Z suffix, as the
+# Pydantic-rendered responses do
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+_point_values = attrgetter(*POINT_FIELDS)
+_creator_values = attrgetter(*CREATOR_FIELDS)
+
+
+def _record_core_rows(rows: Sequence[Any]):
+    """Count plain rows read for a response; ORM objects were counted as they loaded"""
+    if rows and isinstance(rows[0], Row):
+        record_rows(len(rows))
+
+
+def point_dicts(rows: Iterable[Any]) -> List[Dict[str, Any]]:
+    """Response dicts for point rows or ORM objects"""
+    rows = rows if isinstance(rows, (list, tuple)) else list(rows)
+    _record_core_rows(rows)
+    return [dict(zip(POINT_FIELDS, _point_values(row))) for row in rows]
+
+
+def creator_dicts(rows: Iterable[Any]) -> List[Dict[str, Any]]:
+    """Response dicts for creator rows or ORM objects"""
+    rows = rows if isinstance(rows, (list, tuple)) else list(rows)
+    _record_core_rows(rows)
+    return [dict(zip(CREATOR_FIELDS, _creator_values(row))) for row in rows]
+
+
+class PreparedJSONResponse(Response):
+    """JSON response encoded once with orjson, bypassing response_model"""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        start = time.perf_counter()
+        body = orjson.dumps(content, option=JSON_OPTIONS)
+        record_serialization(time.perf_counter() - start)
+        return body
+
+
+def points_response(rows: Sequence[Any]) -> PreparedJSONResponse:
+    return PreparedJSONResponse(point_dicts(rows))
+
+
+def creators_response(rows: Sequence[Any]) -> PreparedJSONResponse:
+    return PreparedJSONResponse(creator_dicts(rows))
+
+
+# Compact layout for map clients: parallel arrays of just what a marker needs,
+# with ids and quantized coordinates delta-encoded against the previous point
+COLUMNAR_MEDIA_TYPE = "application/vnd.donation-points.columnar+json"
+COORD_SCALE = 100_000  # 1e-5 degrees, about a metre
+STATUSES = [point_status.value for point_status in models.PointStatus]
+_STATUS_CODES = {point_status: code for code, point_status in enumerate(models.PointStatus)}
+
+
+def wants_columnar(accept: str, format: str) -> bool:
+    """Whether the client asked for the columnar layout"""
+    return format == "columnar" or COLUMNAR_MEDIA_TYPE in accept
+
+
+def _deltas(values: List[int]) -> List[int]:
+    previous = 0
+    deltas = []
+    for value in values:
+        deltas.append(value - previous)
+        previous = value
+    return deltas
+
+
+def columnar_points(rows: Sequence[Any]) -> Dict[str, Any]:
+    """Points as parallel arrays
+
+    Decode ids and coordinates with a running sum; coordinates are then
+    divided by `scale`. `status` holds indexes into `statuses`.
+    """
+    _record_core_rows(rows)
+    return {
+        "count": len(rows),
+        "scale": COORD_SCALE,
+        "statuses": STATUSES,
+        "id": _deltas([row.id for row in rows]),
+        "lat": _deltas([round(row.latitude * COORD_SCALE) for row in rows]),
+        "lng": _deltas([round(row.longitude * COORD_SCALE) for row in rows]),
+        "status": [_STATUS_CODES[models.PointStatus(row.status)] for row in rows],
+        "name": [row.organization_name for row in rows],
+    }
+
+
+def columnar_response(rows: Sequence[Any]) -> PreparedJSONResponse:
+    return PreparedJSONResponse(columnar_points(rows), media_type=COLUMNAR_MEDIA_TYPE)
@@ -0,0 +1,289 @@
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from . import models
+from .geo import BoundingBox
+from .point_index import STATUS_CODES, Change, PointIndex, point_index
+
+# Tiles at or below this zoom are answered with clusters; above it the
+# client gets the individual points
+MAX_CLUSTER_ZOOM = 12
+MAX_ZOOM = 20
+
+# Each tile is split into a 2^GRID_BITS x 2^GRID_BITS grid of cluster cells
+GRID_BITS = 3
+
+# Web Mercator stops short of the poles
+MAX_MERCATOR_LAT = 85.05112878
+
+TILE_CACHE_SIZE = 4096
+
+# Density grids reuse the cluster cells: resolution r is the grid of zoom-r
+# tiles, aggregated at cluster level r - GRID_BITS
+MIN_DENSITY_RESOLUTION = GRID_BITS
+MAX_DENSITY_RESOLUTION = MAX_CLUSTER_ZOOM + GRID_BITS
+DENSITY_MAX_CELLS = 65536  # cells a bbox may span at the requested resolution
+DENSITY_DEFAULT_CELLS_ACROSS = 64  # target grid width when no resolution is given
+
+# Batches touching more points than this rebuild the aggregation wholesale
+REBUILD_THRESHOLD = 2000
+
+ONGOING = STATUS_CODES[models.PointStatus.ONGOING]
+
+# Aggregate fields per cluster cell
+COUNT, SUM_LAT, SUM_LNG, MIN_LAT, MIN_LNG, MAX_LAT, MAX_LNG, ID_SUM = range(8)
+
+Cell = Tuple[int, int]
+
+
+def tile_xy(lat, lng, zoom: int):
+    """Slippy-map tile (or sub-tile cell) coordinates at a zoom level; vectorized"""
+    scale = 2 ** zoom
+    lat_r = np.radians(np.clip(lat, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    x = np.floor((np.asarray(lng) + 180.0) / 360.0 * scale)
+    y = np.floor((1.0 - np.arcsinh(np.tan(lat_r)) / math.pi) / 2.0 * scale)
+    return np.clip(x, 0, scale - 1).astype(np.int64), np.clip(y, 0, scale - 1).astype(np.int64)
+
+
+def tile_bounds(zoom: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lng, max_lng) covered by a tile"""
+    scale = 2 ** zoom
+
+    def lat_at(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / scale))))
+
+    return lat_at(y + 1), lat_at(y), x / scale * 360.0 - 180.0, (x + 1) / scale * 360.0 - 180.0
+
+
+def _x_ranges(min_lng: float, max_lng: float, zoom: int) -> List[Tuple[int, int]]:
+    """Tile column ranges covering a longitude span, split at the antimeridian"""
+    spans = [(min_lng, max_lng)] if min_lng <= max_lng else [(min_lng, 180.0), (-180.0, max_lng)]
+    return [tuple(int(x) for x in tile_xy(0.0, np.array(span), zoom)[0]) for span in spans]
+
+
+def density_cell_count(bbox: BoundingBox, resolution: int) -> int:
+    """Number of grid cells a bbox spans at a resolution"""
+    min_lat, max_lat, min_lng, max_lng = bbox
+    _, (y0, y1) = tile_xy(np.array([max_lat, min_lat]), 0.0, resolution)
+    rows = int(y1) - int(y0) + 1
+    return sum(x1 - x0 + 1 for x0, x1 in _x_ranges(min_lng, max_lng, resolution)) * rows
+
+
+def density_resolution(bbox: BoundingBox, cells_across: int = DENSITY_DEFAULT_CELLS_ACROSS) -> int:
+    """Finest resolution at which a bbox is at most `cells_across` cells wide and tall"""
+    for resolution in range(MAX_DENSITY_RESOLUTION, MIN_DENSITY_RESOLUTION, -1):
+        if density_cell_count(bbox, resolution) <= cells_across ** 2:
+            return resolution
+    return MIN_DENSITY_RESOLUTION
+
+
+def _aggregate(lats: np.ndarray, lngs: np.ndarray, ids: np.ndarray) -> list:
+    return [
+        len(lats), float(lats.sum()), float(lngs.sum()),
+        float(lats.min()), float(lngs.min()), float(lats.max()), float(lngs.max()),
+        int(ids.sum()),
+    ]
+
+
+def _merge(parts: List[list]) -> list:
+    return [
+        sum(part[COUNT] for part in parts),
+        sum(part[SUM_LAT] for part in parts),
+        sum(part[SUM_LNG] for part in parts),
+        min(part[MIN_LAT] for part in parts),
+        min(part[MIN_LNG] for part in parts),
+        max(part[MAX_LAT] for part in parts),
+        max(part[MAX_LNG] for part in parts),
+        sum(part[ID_SUM] for part in parts),
+    ]
+
+
+class TileIndex:
+    """Per-zoom grid aggregation of ongoing donation points
+
+    For every cluster zoom level the ongoing points are pre-aggregated into
+    the cells of a 2^GRID_BITS grid per tile (count, coordinate sums, bounds).
+    A cluster tile is then a handful of dict lookups, and rendered tiles are
+    kept in an LRU cache. A write only recomputes the finest cells under the
+    point's old and new position, re-derives their ancestors from their four
+    children, and evicts the cached tiles along that path.
+    """
+
+    def __init__(self, index: PointIndex):
+        self._index = index
+        self._lock = threading.RLock()
+        # levels[z] maps cluster cells of zoom-z tiles to aggregates
+        self._levels: List[Dict[Cell, list]] = [{} for _ in range(MAX_CLUSTER_ZOOM + 1)]
+        self._cache: "OrderedDict[Tuple[int, int, int], dict]" = OrderedDict()
+        index.subscribe(self._on_change)
+
+    def _on_change(self, changes: Optional[List[Change]]):
+        with self._lock:
+            if changes is None or len(changes) > REBUILD_THRESHOLD:
+                self._rebuild()
+                return
+            touched = set()
+            for old, new in changes:
+                for position in (old, new):
+                    if position is not None:
+                        x, y = tile_xy(position[0], position[1], MAX_CLUSTER_ZOOM + GRID_BITS)
+                        touched.add((int(x), int(y)))
+            for cell in touched:
+                self._refresh_cell(cell)
+
+    def _rebuild(self):
+        """Aggregate every ongoing point from scratch"""
+        index = self._index
+        n = len(index)
+        keep = index.statuses[:n] == ONGOING
+        lats, lngs, ids = index.lats[:n][keep], index.lngs[:n][keep], index.ids[:n][keep]
+        cx, cy = tile_xy(lats, lngs, MAX_CLUSTER_ZOOM + GRID_BITS)
+
+        self._cache.clear()
+        for zoom in range(MAX_CLUSTER_ZOOM, -1, -1):
+            shift = MAX_CLUSTER_ZOOM - zoom
+            keys = ((cx >> shift) << 32) | (cy >> shift)
+            unique, inverse = np.unique(keys, return_inverse=True)
+            count = np.bincount(inverse, minlength=len(unique))
+            sum_lat = np.bincount(inverse, weights=lats, minlength=len(unique))
+            sum_lng = np.bincount(inverse, weights=lngs, minlength=len(unique))
+            id_sum = np.bincount(inverse, weights=ids, minlength=len(unique))
+            bounds = []
+            for values, reduce, initial in (
+                (lats, np.minimum, np.inf), (lngs, np.minimum, np.inf),
+                (lats, np.maximum, -np.inf), (lngs, np.maximum, -np.inf),
+            ):
+                out = np.full(len(unique), initial)
+                reduce.at(out, inverse, values)
+                bounds.append(out)
+            self._levels[zoom] = {
+                (int(key >> 32), int(key & 0xFFFFFFFF)): [
+                    int(count[i]), float(sum_lat[i]), float(sum_lng[i]),
+                    float(bounds[0][i]), float(bounds[1][i]), float(bounds[2][i]), float(bounds[3][i]),
+                    int(id_sum[i]),
+                ]
+                for i, key in enumerate(unique.tolist())
+            }
+
+    def _refresh_cell(self, cell: Cell):
+        """Recompute one finest-level cell and every ancestor above it"""
+        index = self._index
+        cx, cy = cell
+        finest = MAX_CLUSTER_ZOOM + GRID_BITS
+        min_lat, max_lat, min_lng, max_lng = tile_bounds(finest, cx, cy)
+        slots = index._slots_in_boxes([(min_lat, max_lat, min_lng, max_lng)])
+        if len(slots):
+            slots = slots[index.statuses[slots] == ONGOING]
+            x, y = tile_xy(index.lats[slots], index.lngs[slots], finest)
+            slots = slots[(x == cx) & (y == cy)]
+
+        level = self._levels[MAX_CLUSTER_ZOOM]
+        if len(slots):
+            level[cell] = _aggregate(index.lats[slots], index.lngs[slots], index.ids[slots])
+        else:
+            level.pop(cell, None)
+        self._evict(MAX_CLUSTER_ZOOM, cx, cy)
+
+        for zoom in range(MAX_CLUSTER_ZOOM - 1, -1, -1):
+            child_level = self._levels[zoom + 1]
+            cx, cy = cx >> 1, cy >> 1
+            children = [
+                child_level[child]
+                for child in ((2 * cx, 2 * cy), (2 * cx + 1, 2 * cy), (2 * cx, 2 * cy + 1), (2 * cx + 1, 2 * cy + 1))
+                if child in child_level
+            ]
+            if children:
+                self._levels[zoom][(cx, cy)] = _merge(children)
+            else:
+                self._levels[zoom].pop((cx, cy), None)
+            self._evict(zoom, cx, cy)
+
+    def _evict(self, zoom: int, cx: int, cy: int):
+        self._cache.pop((zoom, cx >> GRID_BITS, cy >> GRID_BITS), None)
+
+    def clusters(self, zoom: int, x: int, y: int) -> dict:
+        """Cluster tile payload, served from the LRU cache when possible"""
+        key = (zoom, x, y)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+            level = self._levels[zoom]
+            size = 2 ** GRID_BITS
+            clusters = []
+            for cx in range(x * size, (x + 1) * size):
+                for cy in range(y * size, (y + 1) * size):
+                    agg = level.get((cx, cy))
+                    if agg is None:
+                        continue
+                    clusters.append({
+                        "count": agg[COUNT],
+                        "latitude": agg[SUM_LAT] / agg[COUNT],
+                        "longitude": agg[SUM_LNG] / agg[COUNT],
+                        "bounds": [agg[MIN_LAT], agg[MIN_LNG], agg[MAX_LAT], agg[MAX_LNG]],
+                        "point_id": agg[ID_SUM] if agg[COUNT] == 1 else None,
+                    })
+
+            tile = {"z": zoom, "x": x, "y": y, "clusters": clusters, "points": []}
+            self._cache[key] = tile
+            if len(self._cache) > TILE_CACHE_SIZE:
+                self._cache.popitem(last=False)
+            return tile
+
+    def density(self, resolution: int, bbox: BoundingBox) -> List[dict]:
+        """Counts and centroids of ongoing points per grid cell overlapping a bbox
+
+        Costs O(cells): the bbox's cell range is probed directly, or the
+        level's occupied cells are filtered when there are fewer of those.
+        """
+        min_lat, max_lat, min_lng, max_lng = bbox
+        _, (y0, y1) = tile_xy(np.array([max_lat, min_lat]), 0.0, resolution)
+        y0, y1 = int(y0), int(y1)
+        x_ranges = _x_ranges(min_lng, max_lng, resolution)
+        span = sum(x1 - x0 + 1 for x0, x1 in x_ranges) * (y1 - y0 + 1)
+
+        with self._lock:
+            level = self._levels[resolution - GRID_BITS]
+            if span <= len(level):
+                cells = [
+                    ((cx, cy), level[(cx, cy)])
+                    for x0, x1 in x_ranges
+                    for cx in range(x0, x1 + 1)
+                    for cy in range(y0, y1 + 1)
+                    if (cx, cy) in level
+                ]
+            else:
+                cells = [
+                    ((cx, cy), agg)
+                    for (cx, cy), agg in level.items()
+                    if y0 <= cy <= y1 and any(x0 <= cx <= x1 for x0, x1 in x_ranges)
+                ]
+            return [
+                {
+                    "x": cx,
+                    "y": cy,
+                    "count": agg[COUNT],
+                    "latitude": agg[SUM_LAT] / agg[COUNT],
+                    "longitude": agg[SUM_LNG] / agg[COUNT],
+                }
+                for (cx, cy), agg in cells
+            ]
+
+    def point_ids(self, zoom: int, x: int, y: int) -> List[int]:
+        """Ids of the ongoing points inside a tile"""
+        index = self._index
+        with index._lock:
+            slots = index._slots_in_boxes([tile_bounds(zoom, x, y)])
+            if not len(slots):
+                return []
+            slots = slots[index.statuses[slots] == ONGOING]
+            tx, ty = tile_xy(index.lats[slots], index.lngs[slots], zoom)
+            return index.ids[slots[(tx == x) & (ty == y)]].tolist()
+
+
+# Process-wide tile aggregation, fed by the shared point index
+tile_index = TileIndex(point_index)
@@ -0,0 +1,185 @@
+"""API benchmark: latency and throughput of the main read and write paths
+
+Seeds a city-clustered synthetic dataset in a throwaway SQLite database and,
+for each dataset size, drives every scenario through an in-process ASGI
+client twice: sequentially (one request at a time, for clean latencies) and
+under concurrent load. Sizes are reached by growing one database, so a
+1M-point run seeds once. Results go to a JSON file tagged with the current
+commit; compare two runs with `python -m benchmarks.compare`.
+
+    python -m benchmarks.api [--sizes 10000 100000 1000000] [--concurrency 32]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from benchmarks.common import CITIES, ROUTES, grow_dataset, random_location, summarize, token_for
+
+import httpx  # noqa: E402
+from app.migrate import upgrade  # noqa: E402
+from app.main import app  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# From a word in every seeded point down to one in a few percent of them
+SEARCH_TERMS = ["relief", "street", "rice", "medicine", "blankets", "point 12"]
+
+
+def scenarios(rng: random.Random, dataset, tokens):
+    """Request factories by scenario name; each returns (method, url, kwargs)"""
+    def radius():
+        lat, lng = random_location(rng)
+        return "GET", "/api/donation-points", {"params": {"lat": lat, "lng": lng, "radius": 5}}
+
+    def text_search():
+        params = {"q": rng.choice(SEARCH_TERMS), "limit": 50}
+        return "GET", "/api/donation-points", {"params": params}
+
+    def text_near():
+        lat, lng = random_location(rng)
+        params = {"q": rng.choice(SEARCH_TERMS), "lat": lat, "lng": lng, "radius": 5}
+        return "GET", "/api/donation-points", {"params": params}
+
+    def route():
+        path = rng.choice(ROUTES)
+        body = {
+            "start_lat": path[0][0], "start_lng": path[0][1],
+            "end_lat": path[-1][0], "end_lng": path[-1][1],
+            "waypoints": [{"lat": lat, "lng": lng} for lat, lng in path[1:-1]],
+            "buffer_km": 2,
+        }
+        return "POST", "/api/donation-points/route", {"json": body}
+
+    def by_id():
+        return "GET", f"/api/donation-points/{rng.randint(1, dataset['points'])}", {}
+
+    def list_creators():
+        params = {"limit": 50, "after_id": rng.randint(0, dataset["creators"])}
+        return "GET", "/api/creators", {"params": params}
+
+    def current_creator():
+        headers = {"Authorization": f"Bearer {rng.choice(tokens)}"}
+        return "GET", "/api/creators/me", {"headers": headers}
+
+    def create_point():
+        lat, lng = random_location(rng)
+        headers = {"Authorization": f"Bearer {rng.choice(tokens)}"}
+        data = {"organization_name": "Benchmark", "address": "Benchmark", "latitude": lat, "longitude": lng}
+        return "POST", "/api/donation-points", {"headers": headers, "data": data}
+
+    return {
+        "radius": radius,
+        "text_search": text_search,
+        "text_near": text_near,
+        "route": route,
+        "by_id": by_id,
+        "list_creators": list_creators,
+        "current_creator": current_creator,
+        "create_point": create_point,
+    }
+
+
+async def timed(client, request) -> float:
+    method, url, kwargs = request()
+    started = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    return elapsed
+
+
+async def sequential(client, request, count: int):
+    started = time.perf_counter()
+    latencies = [await timed(client, request) for _ in range(count)]
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def load(client, request, concurrency: int, duration: float):
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            latencies.append(await timed(client, request))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--requests", type=int, default=200, help="sequential requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of load per scenario")
+    parser.add_argument("--scenarios", nargs="+", help="only run these scenarios")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<commit>-<time>.json)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+        "cities": len(CITIES),
+        "sizes": {},
+    }
+
+    await upgrade()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for size in sorted(args.sizes):
+            started = time.perf_counter()
+            dataset = await grow_dataset(size, rng)
+            print(f"\n{size:,} points, {dataset['creators']:,} creators (seeded in {time.perf_counter() - started:.1f}s)")
+            tokens = [token_for(creator_id) for creator_id in range(1, min(dataset["creators"], 100) + 1)]
+            by_name = scenarios(rng, dataset, tokens)
+            size_results = {}
+            for name, request in by_name.items():
+                if args.scenarios and name not in args.scenarios:
+                    continue
+                await timed(client, request)  # Warm up
+                size_results[name] = {
+                    "sequential": await sequential(client, request, args.requests),
+                    "load": await load(client, request, args.concurrency, args.duration),
+                }
+                for mode, stats in size_results[name].items():
+                    print(
+                        f"  {name:<16} {mode:<10} {stats['throughput']:>8.0f} req/s"
+                        f"  p50 {stats['p50_ms']:>7.2f}  p95 {stats['p95_ms']:>7.2f}  p99 {stats['p99_ms']:>7.2f} ms"
+                    )
+            results["sizes"][str(size)] = {"dataset": dataset, "scenarios": size_results}
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{commit}-{stamp}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,142 @@
+"""Shared setup for the API benchmarks: a throwaway database and synthetic data
+
+Importing this module points DATABASE_URL at a fresh temporary SQLite file
+and turns off the response cache and the expiry job, so it must be imported
+before anything from `app`.
+"""
+import os
+import random
+import statistics
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+_tmpdir = tempfile.mkdtemp(prefix="bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_tmpdir}/bench.sqlite")
+# Measure the handlers, not cache hits, unless a run asks otherwise
+os.environ.setdefault("RESPONSE_CACHE_SIZE", "0")
+os.environ.setdefault("POINT_EXPIRY_INTERVAL", "0")
+
+from sqlalchemy import func, insert, select, text  # noqa: E402
+from app import auth, models  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.point_index import point_index  # noqa: E402
+
+CENTER = (10.7769, 106.7009)  # Ho Chi Minh City
+
+# (lat, lng, share of points, spread in degrees) for the busiest cities
+CITIES = [
+    (10.7769, 106.7009, 0.34, 0.12),  # Ho Chi Minh City
+    (21.0278, 105.8342, 0.26, 0.10),  # Hanoi
+    (16.0544, 108.2022, 0.08, 0.06),  # Da Nang
+    (10.0452, 105.7469, 0.05, 0.06),  # Can Tho
+    (20.8449, 106.6881, 0.05, 0.06),  # Hai Phong
+    (16.4637, 107.5909, 0.03, 0.04),  # Hue
+    (12.2388, 109.1967, 0.03, 0.04),  # Nha Trang
+    (11.9404, 108.4583, 0.02, 0.04),  # Da Lat
+    (10.9574, 106.8427, 0.03, 0.05),  # Bien Hoa
+    (18.6796, 105.6813, 0.02, 0.04),  # Vinh
+]
+# Whatever the cities don't take is scattered over the country
+COUNTRY = ((8.5, 23.4), (102.1, 109.5))
+
+ROUTES = [
+    [(10.7769, 106.7009), (10.9574, 106.8427), (11.9404, 108.4583)],  # HCMC -> Bien Hoa -> Da Lat
+    [(21.0278, 105.8342), (20.8449, 106.6881)],  # Hanoi -> Hai Phong
+    [(16.0544, 108.2022), (16.4637, 107.5909)],  # Da Nang -> Hue
+]
+
+SEED_CHUNK = 10_000
+
+
+def random_location(rng: random.Random) -> Tuple[float, float]:
+    """A location drawn from the city-clustered distribution"""
+    pick = rng.random()
+    for lat, lng, share, spread in CITIES:
+        if pick < share:
+            return rng.gauss(lat, spread), rng.gauss(lng, spread)
+        pick -= share
+    return rng.uniform(*COUNTRY[0]), rng.uniform(*COUNTRY[1])
+
+
+async def count_points() -> int:
+    async with SessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(models.DonationPoint))
+
+
+async def seed_creators(count: int, rng: random.Random) -> Dict[int, bool]:
+    """Add creators up to `count` in total (70% verified); return every creator's verified flag"""
+    async with SessionLocal() as db:
+        existing = await db.scalar(select(func.count()).select_from(models.Creator))
+        rows = [
+            {
+                "name": f"Creator {i}",
+                "email": f"creator{i}@example.com",
+                "verified": rng.random() < 0.7,
+            }
+            for i in range(existing, count)
+        ]
+        if rows:
+            await db.execute(insert(models.Creator), rows)
+            await db.commit()
+        return dict((await db.execute(select(models.Creator.id, models.Creator.verified))).all())
+
+
+async def seed_points(total: int, creators: Dict[int, bool], rng: random.Random):
+    """Grow the donation_points table to `total` rows"""
+    now = datetime.utcnow()
+    creator_ids = sorted(creators)
+    start = await count_points()
+    async with SessionLocal() as db:
+        for offset in range(start, total, SEED_CHUNK):
+            rows = []
+            for i in range(offset, min(offset + SEED_CHUNK, total)):
+                lat, lng = random_location(rng)
+                ended = rng.random() < 0.2
+                creator_id = rng.choice(creator_ids)
+                rows.append({
+                    "creator_id": creator_id,
+                    "creator_verified": creators[creator_id],
+                    "organization_name": f"Relief Point {i}",
+                    "address": f"{i} Benchmark Street",
+                    "latitude": lat,
+                    "longitude": lng,
+                    "description": rng.choice(["Rice and water", "Clothes", "Medicine", "Blankets", None]),
+                    "end_date": now - timedelta(days=1) if ended else now + timedelta(days=30),
+                    "status": models.PointStatus.ENDED if ended else models.PointStatus.ONGOING,
+                })
+            await db.execute(insert(models.DonationPoint), rows)
+            await db.commit()
+
+
+async def grow_dataset(points: int, rng: random.Random) -> Dict[str, int]:
+    """Seed up to `points` points (and 1 creator per 100) and refresh derived state"""
+    creators = await seed_creators(max(10, points // 100), rng)
+    await seed_points(points, creators, rng)
+    async with engine.begin() as connection:
+        await connection.execute(text("ANALYZE"))
+    async with SessionLocal() as db:
+        await point_index.load(db)
+    return {"points": points, "creators": len(creators)}
+
+
+def token_for(creator_id: int) -> str:
+    return auth.create_access_token({"sub": str(creator_id)})
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(latencies: List[float], duration: float) -> Dict[str, float]:
+    """Throughput and latency percentiles (ms) for a list of latencies in seconds"""
+    ms = [latency * 1000 for latency in latencies]
+    return {
+        "requests": len(ms),
+        "throughput": len(ms) / duration if duration else 0.0,
+        "mean_ms": statistics.fmean(ms),
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+    }
@@ -0,0 +1,52 @@
+"""Compare two API benchmark result files
+
+Prints p50/p99 latency and throughput side by side for every size and
+scenario the runs share, flagging p99 regressions beyond the threshold.
+Exits with status 1 if any were found.
+
+    python -m benchmarks.compare BASELINE.json CANDIDATE.json [--threshold 0.2]
+"""
+import argparse
+import json
+import sys
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative p99 slowdown")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"{baseline['commit']} -> {candidate['commit']}")
+    regressions = 0
+    for size, base_size in baseline["sizes"].items():
+        if size not in candidate["sizes"]:
+            continue
+        print(f"\n{int(size):,} points")
+        for name, base_modes in base_size["scenarios"].items():
+            for mode, base in base_modes.items():
+                new = candidate["sizes"][size]["scenarios"].get(name, {}).get(mode)
+                if new is None:
+                    continue
+                change = new["p99_ms"] / base["p99_ms"] - 1 if base["p99_ms"] else 0.0
+                flag = ""
+                if change > args.threshold:
+                    flag = "  REGRESSION"
+                    regressions += 1
+                print(
+                    f"  {name:<16} {mode:<10}"
+                    f" p50 {base['p50_ms']:>7.2f} -> {new['p50_ms']:>7.2f} ms"
+                    f"  p99 {base['p99_ms']:>7.2f} -> {new['p99_ms']:>7.2f} ms ({change:+.0%})"
+                    f"  {base['throughput']:>7.0f} -> {new['throughput']:>7.0f} req/s{flag}"
+                )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Microbenchmark: per-row haversine loop vs the vectorized PointIndex
+
+Run from the repository root:
+
+    python -m benchmarks.haversine
+"""
+import sys
+import time
+import numpy as np
+from benchmarks.common import CENTER
+from app.geo import haversine_distance
+from app.models import PointStatus
+from app.point_index import PointIndex
+
+SIZES = [10_000, 100_000, 1_000_000]
+RADIUS_KM = 50.0
+
+
+def loop_search(lats, lngs, lat, lng, radius):
+    """The original approach: one math-based haversine call per row"""
+    return [
+        i for i in range(len(lats))
+        if haversine_distance(lat, lng, lats[i], lngs[i]) <= radius
+    ]
+
+
+def build_index(ids, lats, lngs) -> PointIndex:
+    """An index built the way production builds it, grid cells included"""
+    index = PointIndex(capacity=len(ids))
+    index.load_rows([
+        (point_id, lat, lng, PointStatus.ONGOING)
+        for point_id, lat, lng in zip(ids.tolist(), lats.tolist(), lngs.tolist())
+    ])
+    return index
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    rng = np.random.default_rng(42)
+    print(f"{'points':>10} {'loop ms':>10} {'numpy ms':>10} {'speedup':>8} {'matches':>8}")
+    for size in SIZES:
+        # Spread points over Vietnam's rough extent
+        lats = rng.uniform(8.5, 23.4, size)
+        lngs = rng.uniform(102.1, 109.5, size)
+        ids = np.arange(1, size + 1)
+        index = build_index(ids, lats, lngs)
+        lat_list, lng_list = lats.tolist(), lngs.tolist()
+
+        loop_time, loop_hits = best_of(
+            lambda: loop_search(lat_list, lng_list, *CENTER, RADIUS_KM), repeat=1 if size >= 1_000_000 else 3
+        )
+        numpy_time, (hit_ids, _) = best_of(lambda: index.within_radius(*CENTER, RADIUS_KM), repeat=5)
+
+        if len(loop_hits) != len(hit_ids):
+            sys.exit(f"result mismatch at {size}: {len(loop_hits)} vs {len(hit_ids)}")
+        print(
+            f"{size:>10} {loop_time * 1000:>10.1f} {numpy_time * 1000:>10.2f}"
+            f" {loop_time / numpy_time:>7.0f}x {len(hit_ids):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
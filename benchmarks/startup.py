@@ -0,0 +1,143 @@
+"""Startup benchmark: import time of app.main and time to the first 200
+
+Each measurement runs in a fresh interpreter against a throwaway SQLite
+database. Import time is the cumulative `app.main` figure from
+`python -X importtime`; time to first 200 is from spawning uvicorn until
+GET /health answers, so it covers imports and the lifespan warmup. The
+database is migrated up front with `python -m app.migrate upgrade`, as in a
+deployment, and that is timed on its own; the first server start is
+reported separately from the median of the restarts that follow.
+
+Exits with status 1 if a median exceeds its budget, or if a module that
+should load lazily is imported by app.main.
+
+    python -m benchmarks.startup [--runs 5] [--import-budget-ms 1500] [--first-200-budget-ms 3000]
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only needed by logins, password hashing and tokens (python-jose loads bcrypt);
+# importing app.main must not load them
+LAZY_MODULES = ["google.auth", "google.oauth2", "requests", "passlib", "bcrypt"]
+
+# Default budgets for the medians (ms)
+IMPORT_BUDGET_MS = 1500
+FIRST_200_BUDGET_MS = 3000
+
+IMPORTTIME_PATTERN = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| app\.main$", re.MULTILINE)
+
+
+def environment(database_path: str) -> dict:
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite+aiosqlite:///{database_path}"
+    env["POINT_EXPIRY_INTERVAL"] = "0"
+    return env
+
+
+def import_time_ms(env: dict) -> float:
+    """Cumulative import time of app.main in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return int(IMPORTTIME_PATTERN.search(result.stderr).group(1)) / 1000
+
+
+def eagerly_loaded(env: dict) -> list:
+    """LAZY_MODULES that importing app.main loads anyway"""
+    script = (
+        "import sys, app.main; "
+        f"print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return result.stdout.split()
+
+
+def migrate_ms(env: dict) -> float:
+    """Time to apply every migration to the database"""
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "app.migrate", "upgrade"],
+        cwd=ROOT, env=env, capture_output=True, check=True,
+    )
+    return (time.perf_counter() - start) * 1000
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def first_200_ms(env: dict, timeout: float = 30.0) -> float:
+    """Time from spawning the server until /health answers 200"""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"server exited with status {server.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+        raise RuntimeError(f"no 200 from /health within {timeout:.0f}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--first-200-budget-ms", type=float, default=FIRST_200_BUDGET_MS)
+    args = parser.parse_args()
+
+    env = environment(os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.sqlite"))
+
+    imports = [import_time_ms(env) for _ in range(args.runs)]
+    migration = migrate_ms(env)
+    cold_start = first_200_ms(env)
+    restarts = [first_200_ms(env) for _ in range(args.runs)]
+    loaded = eagerly_loaded(env)
+
+    failures = 0
+    for label, value, budget in (
+        ("import app.main", statistics.median(imports), args.import_budget_ms),
+        ("first 200", statistics.median(restarts), args.first_200_budget_ms),
+    ):
+        over = value > budget
+        failures += over
+        print(f"{label:<16} median {value:>7.1f} ms  budget {budget:>7.1f} ms{'  OVER BUDGET' if over else ''}")
+    print(f"import range     {min(imports):.1f}-{max(imports):.1f} ms over {args.runs} runs")
+    print(f"migrate          {migration:.1f} ms on an empty database")
+    print(f"cold first 200   {cold_start:.1f} ms on the first start")
+    if loaded:
+        failures += 1
+        print(f"loaded eagerly: {', '.join(loaded)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Load test: GET latency with and without a concurrent write burst
+
+Drives the app in-process through an ASGI client against a throwaway SQLite
+database. Readers hammer radius searches and by-id lookups, first alone and
+then while writers create points as fast as they can; p99 of the reads should
+stay roughly flat between the two phases.
+
+    python -m benchmarks.write_burst [--points 20000] [--readers 32] [--writers 4]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+from benchmarks.common import CENTER, percentile
+
+import httpx  # noqa: E402
+from app import auth, models  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.migrate import upgrade  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+async def seed(points: int) -> str:
+    """Create one creator and `points` points around the center; return a token"""
+    async with SessionLocal() as db:
+        creator = models.Creator(name="Bench", email="bench@example.com", verified=True)
+        db.add(creator)
+        await db.flush()
+        db.add_all([
+            models.DonationPoint(
+                creator_id=creator.id,
+                organization_name=f"Point {i}",
+                address="Benchmark",
+                latitude=random.gauss(CENTER[0], 0.3),
+                longitude=random.gauss(CENTER[1], 0.3),
+                creator_verified=True,
+            )
+            for i in range(points)
+        ])
+        await db.commit()
+        return auth.create_access_token({"sub": str(creator.id)})
+
+
+async def reader(client, points, stop, latencies):
+    while not stop.is_set():
+        if random.random() < 0.5:
+            url = f"/api/donation-points/{random.randint(1, points)}"
+            params = None
+        else:
+            url = "/api/donation-points"
+            params = {
+                "lat": random.gauss(CENTER[0], 0.2),
+                "lng": random.gauss(CENTER[1], 0.2),
+                "radius": 5,
+            }
+        started = time.perf_counter()
+        response = await client.get(url, params=params)
+        latencies.append(time.perf_counter() - started)
+        response.raise_for_status()
+
+
+async def writer(client, token, stop, counter):
+    headers = {"Authorization": f"Bearer {token}"}
+    while not stop.is_set():
+        response = await client.post("/api/donation-points", headers=headers, data={
+            "organization_name": "Burst",
+            "address": "Benchmark",
+            "latitude": random.gauss(CENTER[0], 0.3),
+            "longitude": random.gauss(CENTER[1], 0.3),
+        })
+        response.raise_for_status()
+        counter.append(1)
+
+
+async def phase(client, args, token, with_writes):
+    stop = asyncio.Event()
+    latencies, writes = [], []
+    tasks = [asyncio.create_task(reader(client, args.points, stop, latencies)) for _ in range(args.readers)]
+    if with_writes:
+        tasks += [asyncio.create_task(writer(client, token, stop, writes)) for _ in range(args.writers)]
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return latencies, len(writes)
+
+
+def report(name, latencies, writes, duration):
+    ms = [latency * 1000 for latency in latencies]
+    print(
+        f"{name:<12} reads/s {len(ms) / duration:>8.0f}  writes/s {writes / duration:>6.0f}"
+        f"  p50 {statistics.median(ms):>7.2f} ms  p95 {percentile(ms, 95):>7.2f} ms"
+        f"  p99 {percentile(ms, 99):>7.2f} ms"
+    )
+    return percentile(ms, 99)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--readers", type=int, default=32)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per phase")
+    args = parser.parse_args()
+
+    await upgrade()
+    token = await seed(args.points)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/api/donation-points", params={"lat": CENTER[0], "lng": CENTER[1]})  # warm up
+        baseline, _ = await phase(client, args, token, with_writes=False)
+        burst, writes = await phase(client, args, token, with_writes=True)
+
+    base_p99 = report("reads only", baseline, 0, args.duration)
+    burst_p99 = report("write burst", burst, writes, args.duration)
+    print(f"p99 ratio (burst / baseline): {burst_p99 / base_p99:.2f}")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
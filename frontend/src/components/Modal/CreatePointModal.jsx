@@ -118,11 +118,12 @@ function CreatePointModal({ isOpen, onClose, onSuccess }) {
       if (formData.description) {
         formDataToSend.append('description', formData.description)
       }
+      // datetime-local values are local wall time; send them with their offset
       if (formData.start_date) {
-        formDataToSend.append('start_date', formData.start_date)
+        formDataToSend.append('start_date', new Date(formData.start_date).toISOString())
       }
       if (formData.end_date) {
-        formDataToSend.append('end_date', formData.end_date)
+        formDataToSend.append('end_date', new Date(formData.end_date).toISOString())
       }
 
       await pointsAPI.create(formDataToSend)
@@ -55,6 +55,9 @@ function HomePage() {
         params.lng = userLocation.lng
         params.radius = 50 // 50km radius
       }
+      if (filters.verified !== null) {
+        params.creator_verified = filters.verified
+      }
       const response = await pointsAPI.getAll(params)
       setAllPoints(response.data)
     } catch (error) {
@@ -65,14 +65,53 @@ export const adminAPI = {
   unverifyCreator: (id) => api.post(`/api/admin/creators/${id}/unverify`),
 }
 
+// Expand the compact columnar search response into marker objects
+export const decodeColumnarPoints = (data) => {
+  const points = new Array(data.count)
+  let id = 0
+  let lat = 0
+  let lng = 0
+  for (let i = 0; i < data.count; i++) {
+    id += data.id[i]
+    lat += data.lat[i]
+    lng += data.lng[i]
+    points[i] = {
+      id,
+      latitude: lat / data.scale,
+      longitude: lng / data.scale,
+      status: data.statuses[data.status[i]],
+      organization_name: data.name[i],
+    }
+  }
+  return points
+}
+
 // Donation Points API
 export const pointsAPI = {
   getAll: (params) => api.get('/api/donation-points', { params }),
+  getMapPoints: (params) => api.get('/api/donation-points', {
+    params,
+    headers: { Accept: 'application/vnd.donation-points.columnar+json' },
+  }).then((response) => ({ ...response, data: decodeColumnarPoints(response.data) })),
+  getChanges: (since, limit) => api.get('/api/donation-points/changes', { params: { since, limit } }),
+  // Server-sent events for point changes, optionally limited to
+  // { min_lat, max_lat, min_lng, max_lng }
+  subscribeLive: (bbox) => new EventSource(
+    `${API_URL}/api/donation-points/live${bbox ? `?${new URLSearchParams(bbox)}` : ''}`
+  ),
+  getNearest: (lat, lng, k) => api.get('/api/donation-points/nearest', { params: { lat, lng, k } }),
+  searchRoute: (route) => api.post('/api/donation-points/route', route),
+  getTile: (z, x, y) => api.get(`/api/donation-points/tiles/${z}/${x}/${y}`),
+  getDensity: ([minLat, minLng, maxLat, maxLng], resolution) =>
+    api.get('/api/donation-points/density', {
+      params: { bbox: [minLat, minLng, maxLat, maxLng].join(','), resolution },
+    }),
   getById: (id) => api.get(`/api/donation-points/${id}`),
   create: (formData) => api.post('/api/donation-points', formData, {
     headers: { 'Content-Type': 'multipart/form-data' },
   }),
   update: (id, data) => api.patch(`/api/donation-points/${id}`, data),
+  bulkCreate: (points) => api.post('/api/donation-points/bulk', points),
 }
 
 export default api
@@ -0,0 +1,26 @@
+"""Test setup: a throwaway database for the app, configured before `app` is imported"""
+import os
+import tempfile
+
+_tmpdir = tempfile.mkdtemp(prefix="tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmpdir}/app.sqlite"
+os.environ.setdefault("RESPONSE_CACHE_SIZE", "0")
+os.environ.setdefault("POINT_EXPIRY_INTERVAL", "0")
+os.environ.setdefault("INVALIDATION_BACKEND", "local")
+
+import pytest  # noqa: E402
+from app.database import _create_engines  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def database(tmp_path):
+    """A read-write engine on an empty database file of its own"""
+    engine, read_engine = _create_engines(f"sqlite+aiosqlite:///{tmp_path}/test.sqlite")
+    yield engine
+    await engine.dispose()
+    await read_engine.dispose()
@@ -0,0 +1,32 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import bulk
+from app.migrate import upgrade
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_rejected_rows_are_reported_alone(database):
+    await upgrade(database)
+    async with database.begin() as connection:
+        await connection.execute(text("INSERT INTO creators (name, email, verified) VALUES ('Bulk', 'bulk@example.com', 0)"))
+        await connection.execute(text(
+            "CREATE TRIGGER reject_test_rows BEFORE INSERT ON donation_points "
+            "WHEN new.organization_name = 'Rejected' BEGIN SELECT RAISE(ABORT, 'rejected by test'); END"
+        ))
+    raw_rows = [
+        {"organization_name": "Rejected" if i in (3, 7) else f"Point {i}", "address": "Street",
+         "latitude": 10.0, "longitude": 106.0}
+        for i in range(10)
+    ]
+    valid, _ = bulk.validate_rows(raw_rows)
+
+    async with AsyncSession(database) as db:
+        ids, errors = await bulk.insert_points(db, 1, valid, chunk_size=4)
+
+    assert len(ids) == 8
+    assert [error.row for error in errors] == [3, 7]
+    for error in errors:
+        assert error.errors == ["insert failed: the row violates a database constraint"]
+        assert "INSERT" not in error.errors[0]
@@ -0,0 +1,36 @@
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from app.cache import DataVersion, ResponseCache, ResponseCacheMiddleware
+
+pytestmark = pytest.mark.anyio
+
+
+def cached_app():
+    async def point(request):
+        return JSONResponse({"id": 1, "description": "rice and water " * 200})
+
+    app = Starlette(routes=[Route("/api/donation-points/{point_id:int}", point)])
+    app = ResponseCacheMiddleware(app, cache=ResponseCache(), version=DataVersion())
+    return GZipMiddleware(app, minimum_size=100)
+
+
+async def test_encodings_share_a_weak_etag():
+    transport = httpx.ASGITransport(app=cached_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        gzipped = await client.get("/api/donation-points/1", headers={"Accept-Encoding": "gzip"})
+        identity = await client.get("/api/donation-points/1", headers={"Accept-Encoding": "identity"})
+        assert gzipped.headers["content-encoding"] == "gzip"
+        assert "content-encoding" not in identity.headers
+        etag = gzipped.headers["etag"]
+        assert etag.startswith('W/"') and identity.headers["etag"] == etag
+
+        # Either form of the tag revalidates either encoding
+        for tag, encoding in ((etag, "identity"), (etag[2:], "gzip")):
+            response = await client.get(
+                "/api/donation-points/1", headers={"If-None-Match": tag, "Accept-Encoding": encoding}
+            )
+            assert response.status_code == 304
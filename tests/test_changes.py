@@ -0,0 +1,59 @@
+import httpx
+import pytest
+from app import models
+from app.database import SessionLocal
+from app.main import app
+from app.migrate import upgrade
+
+pytestmark = pytest.mark.anyio
+
+
+async def latest_cursor(client) -> int:
+    cursor, has_more = 0, True
+    while has_more:
+        feed = (await client.get("/api/donation-points/changes", params={"since": cursor, "limit": 10000})).json()
+        cursor, has_more = feed["cursor"], feed["has_more"]
+    return cursor
+
+
+async def test_changes_since_a_cursor():
+    await upgrade()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        since = await latest_cursor(client)
+
+        async with SessionLocal() as db:
+            creator = models.Creator(name="Changes", email="changes@example.com", verified=False)
+            db.add(creator)
+            await db.flush()
+            kept, removed = (
+                models.DonationPoint(
+                    creator_id=creator.id, organization_name=name, address="Changes", latitude=1.0, longitude=2.0
+                )
+                for name in ("Kept", "Removed")
+            )
+            db.add_all([kept, removed])
+            await db.commit()
+            kept.description = "Updated after the insert"
+            await db.commit()
+            await db.delete(removed)
+            await db.commit()
+
+        # Each point appears once, in the order of its latest write
+        feed = (await client.get("/api/donation-points/changes", params={"since": since})).json()
+        assert [(change["op"], change["id"]) for change in feed["changes"]] == [
+            ("upsert", kept.id), ("delete", removed.id)
+        ]
+        assert feed["changes"][0]["point"]["description"] == "Updated after the insert"
+        assert feed["changes"][1]["point"] is None
+        assert not feed["has_more"]
+
+        # Paging hands back the sequence to resume from
+        first = (await client.get("/api/donation-points/changes", params={"since": since, "limit": 1})).json()
+        assert first["has_more"] and first["cursor"] == feed["changes"][0]["seq"]
+        rest = (await client.get("/api/donation-points/changes", params={"since": first["cursor"]})).json()
+        assert rest["changes"] == feed["changes"][1:] and rest["cursor"] == feed["cursor"]
+
+        # Nothing new: the cursor stays put
+        idle = (await client.get("/api/donation-points/changes", params={"since": feed["cursor"]})).json()
+        assert idle == {"changes": [], "cursor": feed["cursor"], "has_more": False}
@@ -0,0 +1,61 @@
+import httpx
+import pytest
+from app import auth, models
+from app.cache import data_version
+from app.database import SessionLocal
+from app.main import app
+from app.migrate import upgrade
+from app.routers import creators
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_returning_login_leaves_caches_alone():
+    await upgrade()
+    idinfo = {"sub": "google-returning", "email": "returning@example.com", "name": "Returning"}
+    async with SessionLocal() as db:
+        await creators._login_creator(db, idinfo)
+    version = data_version.value
+
+    async with SessionLocal() as db:
+        token = await creators._login_creator(db, idinfo)
+    assert token["access_token"]
+    assert data_version.value == version
+
+
+async def test_principal_cache_follows_creator_writes():
+    await upgrade()
+    async with SessionLocal() as db:
+        admin = models.Creator(name="Admin", email="principal-admin@example.com", verified=True)
+        creator = models.Creator(name="Principal", email="principal@example.com", verified=False)
+        db.add_all([admin, creator])
+        await db.commit()
+    token = auth.create_access_token({"sub": str(creator.id)})
+    headers = {"Authorization": f"Bearer {token}"}
+    admin_headers = {"Authorization": f"Bearer {auth.create_access_token({'sub': str(admin.id)})}"}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async def me() -> dict:
+            response = await client.get("/api/creators/me", headers=headers)
+            assert auth.principal_cache.get(token) is not None
+            return response.json()
+
+        assert (await me())["verified"] is False
+
+        await client.post(f"/api/admin/creators/{creator.id}/verify", headers=admin_headers)
+        assert auth.principal_cache.get(token) is None
+        assert (await me())["verified"] is True
+
+        await client.post(f"/api/admin/creators/{creator.id}/unverify", headers=admin_headers)
+        assert auth.principal_cache.get(token) is None
+        assert (await me())["verified"] is False
+
+        await client.patch(f"/api/creators/{creator.id}", json={"name": "Renamed"}, headers=headers)
+        assert auth.principal_cache.get(token) is None
+        assert (await me())["name"] == "Renamed"
+
+        response = await client.delete(f"/api/creators/{creator.id}", headers=headers)
+        assert response.status_code == 204
+        assert auth.principal_cache.get(token) is None
+        assert (await client.get("/api/creators/me", headers=headers)).status_code == 401
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import select, text
+from app import models
+from app.database import SessionLocal
+from app.expiry import expire_points
+from app.migrate import upgrade
+
+pytestmark = pytest.mark.anyio
+
+HANOI = timezone(timedelta(hours=7))
+
+
+async def add_point(end_date: datetime) -> int:
+    async with SessionLocal() as db:
+        creator = models.Creator(name="Expiry", email=f"expiry{end_date.timestamp()}@example.com", verified=False)
+        db.add(creator)
+        await db.flush()
+        point = models.DonationPoint(
+            creator_id=creator.id, organization_name="Expiry", address="Expiry",
+            latitude=21.0, longitude=105.8, end_date=end_date,
+        )
+        db.add(point)
+        await db.commit()
+        return point.id
+
+
+async def test_end_dates_are_stored_in_utc():
+    await upgrade()
+    point_id = await add_point(datetime(2030, 1, 1, 12, 0, tzinfo=HANOI))
+    async with SessionLocal() as db:
+        stored = (await db.execute(text("SELECT end_date FROM donation_points WHERE id = :id"), {"id": point_id})).scalar()
+        loaded = await db.scalar(select(models.DonationPoint.end_date).where(models.DonationPoint.id == point_id))
+    assert stored.startswith("2030-01-01 05:00:00")
+    assert loaded == datetime(2030, 1, 1, 5, 0, tzinfo=timezone.utc)
+
+
+async def test_points_expire_at_their_end_date_in_any_offset():
+    await upgrade()
+    # A minute ago in Hanoi: naive local wall time would be 7 hours in the future
+    ended = await add_point(datetime.now(HANOI) - timedelta(minutes=1))
+    ongoing = await add_point(datetime.now(HANOI) + timedelta(minutes=1))
+
+    await expire_points()
+
+    async with SessionLocal() as db:
+        statuses = dict((await db.execute(
+            select(models.DonationPoint.id, models.DonationPoint.status)
+            .where(models.DonationPoint.id.in_([ended, ongoing]))
+        )).all())
+    assert statuses == {ended: models.PointStatus.ENDED, ongoing: models.PointStatus.ONGOING}
@@ -0,0 +1,38 @@
+import httpx
+import pytest
+from app.geo import MAX_CORRIDOR_PIECES, corridor_boxes, path_length
+from app.main import app
+
+
+def zigzag(waypoints: int):
+    """A path bouncing between two far-apart points"""
+    return [(10.0, 100.0) if i % 2 else (20.0, 110.0) for i in range(waypoints)]
+
+
+def test_corridor_box_count_is_bounded():
+    path = zigzag(1002)
+    boxes = corridor_boxes(path, 0.1)
+    assert path_length(path) > 1_000_000
+    # A circle crossing the antimeridian takes two boxes
+    assert len(boxes) <= 2 * (MAX_CORRIDOR_PIECES + len(path) - 1)
+
+
+def test_corridor_covers_short_routes_finely():
+    # Under the cap, pieces stay at twice the buffer
+    assert len(corridor_boxes([(10.0, 106.0), (10.0, 106.9)], 1.0)) == 50
+
+
+@pytest.mark.anyio
+async def test_long_routes_are_rejected():
+    start, end = zigzag(2)
+    body = {
+        "start_lat": start[0], "start_lng": start[1], "end_lat": end[0], "end_lng": end[1],
+        "waypoints": [{"lat": lat, "lng": lng} for lat, lng in zigzag(100)],
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/api/donation-points/route", json=body)
+        assert response.status_code == 422
+        params = {"start_lat": -40, "start_lng": -170, "end_lat": 40, "end_lng": 170}
+        response = await client.get("/api/donation-points", params=params)
+        assert response.status_code == 422
@@ -0,0 +1,125 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt, jwt
+from app import google_auth
+from app.main import app
+from app.routers import creators
+
+CLIENT_ID = "test-client.apps.googleusercontent.com"
+KEY_ID = "test-key"
+
+
+@pytest.fixture(scope="module")
+def signing_key():
+    """An RSA key and a self-signed certificate for it, as Google publishes them"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "test")])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    return private_pem, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+class CertServer:
+    """Serves one certs document over local HTTP and counts the fetches"""
+
+    def __init__(self, certs: dict, max_age: int):
+        body = json.dumps(certs).encode()
+        self.fetches = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.fetches += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", f"public, max-age={max_age}")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/oauth2/v1/certs"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def cert_server(signing_key, monkeypatch, request):
+    max_age = getattr(request, "param", 3600)
+    server = CertServer({KEY_ID: signing_key[1]}, max_age)
+    monkeypatch.setattr(google_auth, "GOOGLE_CERTS_URL", server.url)
+    monkeypatch.setattr(google_auth, "transport", google_auth.CachingRequest())
+    monkeypatch.setattr(creators, "GOOGLE_CLIENT_ID", CLIENT_ID)
+    yield server
+    server.close()
+
+
+def sign(signing_key, **claims) -> str:
+    now = int(time.time())
+    payload = {
+        "iss": "https://accounts.google.com",
+        "aud": CLIENT_ID,
+        "sub": "1234567890",
+        "email": "someone@example.com",
+        "iat": now,
+        "exp": now + 600,
+        **claims,
+    }
+    signer = crypt.RSASigner.from_string(signing_key[0], key_id=KEY_ID)
+    return jwt.encode(signer, payload).decode()
+
+
+def test_certs_are_fetched_once(signing_key, cert_server):
+    token = sign(signing_key)
+    for _ in range(5):
+        assert google_auth.verify_id_token(token, CLIENT_ID)["sub"] == "1234567890"
+    assert cert_server.fetches == 1
+
+
+@pytest.mark.parametrize("cert_server", [1], indirect=True)
+def test_certs_are_refetched_after_expiry(signing_key, cert_server):
+    token = sign(signing_key)
+    google_auth.verify_id_token(token, CLIENT_ID)
+    google_auth.verify_id_token(token, CLIENT_ID)
+    assert cert_server.fetches == 1
+
+    time.sleep(1.1)
+    google_auth.verify_id_token(token, CLIENT_ID)
+    assert cert_server.fetches == 2
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("claims", [{"aud": "someone-else"}, {"iss": "https://evil.example.com"}])
+async def test_wrong_audience_or_issuer_is_unauthorized(signing_key, cert_server, claims):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/api/creators/login", json={"id_token": sign(signing_key, **claims)})
+    assert response.status_code == 401
+    assert cert_server.fetches == 1
@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+from app.database import ReadSessionLocal, engine
+from app.invalidation import CREATORS, INVALIDATIONS_TABLE, POINTS, Message, SQLiteBackend, bus
+from app.migrate import upgrade
+from app.point_index import point_index
+from .test_migrate import seed
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_writes_published_during_a_load_are_applied(monkeypatch):
+    await upgrade()
+    await seed(engine, creators=1, points=20, start=20_000)
+    async with engine.connect() as connection:
+        deleted = (await connection.execute(text("SELECT max(id) FROM donation_points"))).scalar()
+
+    async with ReadSessionLocal() as db:
+        execute = db.execute
+
+        async def slow_execute(*args, **kwargs):
+            # The rows are read now; the writes below land after the read
+            result = await execute(*args, **kwargs)
+            await asyncio.sleep(0.2)
+            return result
+
+        monkeypatch.setattr(db, "execute", slow_execute)
+        loading = asyncio.create_task(point_index.load(db))
+        await asyncio.sleep(0.05)
+        assert point_index.loading
+
+        # Another worker inserts one point and deletes another, then publishes
+        async with engine.begin() as connection:
+            created = (await connection.execute(text(
+                "INSERT INTO donation_points (creator_id, organization_name, address, latitude, longitude, status) "
+                "SELECT creator_id, 'Late', 'Late', 10.5, 106.5, 'ONGOING' FROM donation_points WHERE id = :id "
+                "RETURNING id"
+            ), {"id": deleted})).scalar()
+            await connection.execute(text("DELETE FROM donation_points WHERE id = :id"), {"id": deleted})
+        await bus.deliver([Message(POINTS, [created, deleted])])
+        await loading
+
+    ids = set(point_index.ids[:len(point_index)].tolist())
+    assert point_index.loaded and not point_index.loading
+    assert created in ids
+    assert deleted not in ids
+
+
+async def test_sequence_gap_resynchronizes_everything():
+    await upgrade()
+    delivered = []
+
+    async def deliver(messages):
+        delivered.append(messages)
+
+    backend = SQLiteBackend(interval=3600)
+    await backend.start("this-worker", deliver)
+    other = SQLiteBackend()
+    try:
+        await other.publish("other-worker", [Message(POINTS, [1, 2])])
+        await backend.publish("this-worker", [Message(CREATORS, [3])])
+        await other.publish("other-worker", [Message(CREATORS, [4])])
+        await backend.poll()
+        # In order, without this worker's own messages
+        assert delivered == [[Message(POINTS, [1, 2]), Message(CREATORS, [4])]]
+
+        # A message pruned before this worker read it leaves a gap
+        await other.publish("other-worker", [Message(POINTS, [5]), Message(POINTS, [6])])
+        async with engine.begin() as connection:
+            await connection.execute(text(
+                f"DELETE FROM {INVALIDATIONS_TABLE} WHERE seq = (SELECT min(seq) FROM {INVALIDATIONS_TABLE} "
+                "WHERE seq > :cursor)"
+            ), {"cursor": backend.cursor})
+        delivered.clear()
+        await backend.poll()
+        assert delivered == [[Message(POINTS, None), Message(CREATORS, None)]]
+
+        # Caught up again: the next message is delivered as usual
+        delivered.clear()
+        await other.publish("other-worker", [Message(POINTS, [7])])
+        await backend.poll()
+        assert delivered == [[Message(POINTS, [7])]]
+    finally:
+        await backend.stop()
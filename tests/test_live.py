@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+from app import models
+from app.database import SessionLocal
+from app.live import CREATE, Subscriber, broadcaster, event_stream
+from app.migrate import upgrade
+
+pytestmark = pytest.mark.anyio
+
+
+async def add_points(*locations) -> list:
+    async with SessionLocal() as db:
+        creator = models.Creator(name="Live", email=f"live{locations}@example.com", verified=False)
+        db.add(creator)
+        await db.flush()
+        points = [
+            models.DonationPoint(creator_id=creator.id, organization_name="Live", address="Live", latitude=lat, longitude=lng)
+            for lat, lng in locations
+        ]
+        db.add_all(points)
+        await db.commit()
+        return [point.id for point in points]
+
+
+async def received(subscriber: Subscriber, timeout: float = 0.5) -> list:
+    """Ids of the create events delivered to a subscriber within `timeout`"""
+    ids = []
+    try:
+        while True:
+            event = await asyncio.wait_for(subscriber.queue.get(), timeout)
+            if event["type"] == CREATE:
+                ids.append(event["id"])
+    except asyncio.TimeoutError:
+        return ids
+
+
+async def test_events_are_filtered_by_bbox(monkeypatch):
+    await upgrade()
+    monkeypatch.setattr(broadcaster, "interval", 0.05)
+    hanoi = Subscriber((20.5, 21.5, 105.0, 106.5))
+    # Crosses the antimeridian
+    bering = Subscriber((60.0, 70.0, 170.0, -170.0))
+    elsewhere = Subscriber((-50.0, -40.0, 0.0, 10.0))
+    everywhere = Subscriber()
+    try:
+        for subscriber in (hanoi, bering, elsewhere, everywhere):
+            await broadcaster.subscribe(subscriber)
+
+        in_hanoi, east_of_line, west_of_line = await add_points((21.0, 105.8), (65.0, 175.0), (65.0, -175.0))
+
+        assert await received(hanoi) == [in_hanoi]
+        assert await received(bering) == [east_of_line, west_of_line]
+        assert await received(elsewhere) == []
+        assert await received(everywhere) == [in_hanoi, east_of_line, west_of_line]
+    finally:
+        await broadcaster.stop()
+
+
+async def test_closing_the_stream_unsubscribes(monkeypatch):
+    await upgrade()
+    monkeypatch.setattr(broadcaster, "interval", 0.05)
+    subscriber = Subscriber()
+    try:
+        stream = event_stream(subscriber, await broadcaster.subscribe(subscriber), None)
+        assert await stream.__anext__() == b"retry: 3000\n\n"
+        assert subscriber in broadcaster.subscribers
+
+        # The client went away
+        await stream.aclose()
+        assert subscriber not in broadcaster.subscribers
+
+        # With nobody listening, the broadcaster stops polling
+        await asyncio.sleep(0.2)
+        assert broadcaster._task is None
+        await add_points((21.0, 105.8))
+        await asyncio.sleep(0.2)
+        assert subscriber.queue.empty()
+    finally:
+        await broadcaster.stop()
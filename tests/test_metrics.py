@@ -0,0 +1,26 @@
+import re
+import httpx
+import pytest
+from app.database import engine
+from app.main import app
+from app.migrate import upgrade
+from .test_migrate import seed
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_plain_row_listings_count_loaded_rows():
+    await upgrade()
+    await seed(engine, creators=2, points=30, start=10_000)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        points = (await client.get("/api/donation-points", params={"limit": 7})).json()
+        creators = (await client.get("/api/creators", params={"limit": 2})).json()
+        exposition = (await client.get("/metrics")).text
+
+    def loaded(route):
+        match = re.search(rf'db_rows_loaded_total{{method="GET",route="{route}"}} (\d+)', exposition)
+        return int(match.group(1)) if match else 0
+
+    assert len(points) == 7 and loaded("/api/donation-points") >= 7
+    assert len(creators) == 2 and loaded("/api/creators") >= 2
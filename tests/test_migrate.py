@@ -0,0 +1,146 @@
+import os
+import subprocess
+import sys
+import pytest
+from sqlalchemy import select, text
+from app import migrate, models
+from app.migrate import MIGRATIONS, PASS, PLAN_CHECK_MIN_ROWS, check_plans, pending_migrations, upgrade
+from app.pagination import paginate
+from app.routers.donation_points import status_criterion
+from app.serialization import POINT_COLUMNS
+
+pytestmark = pytest.mark.anyio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LATEST = MIGRATIONS[-1].version
+
+
+async def seed(engine, creators: int, points: int, start: int = 0):
+    """Insert rows through plain SQL, as a database from any schema version accepts them"""
+    async with engine.begin() as connection:
+        await connection.execute(
+            text("INSERT INTO creators (name, email, verified) VALUES (:name, :email, :verified)"),
+            [
+                {"name": f"Creator {i}", "email": f"creator{i}@example.com", "verified": i % 3 == 0}
+                for i in range(start, start + creators)
+            ],
+        )
+        creator_ids = [row[0] for row in await connection.execute(text("SELECT id FROM creators"))]
+        await connection.execute(
+            text(
+                "INSERT INTO donation_points (creator_id, organization_name, address, latitude, longitude, "
+                "description, end_date, status) VALUES (:creator_id, :name, :address, :lat, :lng, "
+                "'Rice and water', '2030-01-01 00:00:00', :status)"
+            ),
+            [
+                {
+                    "creator_id": creator_ids[i % len(creator_ids)],
+                    "name": f"Relief Point {i}",
+                    "address": f"{i} Test Street",
+                    "lat": 10 + (i % 100) / 100,
+                    "lng": 106 + (i // 100 % 100) / 100,
+                    "status": "ONGOING" if i % 5 else "ENDED",
+                }
+                for i in range(start, start + points)
+            ],
+        )
+
+
+async def applied_versions(engine):
+    async with engine.connect() as connection:
+        return [row[0] for row in await connection.execute(text("SELECT version FROM schema_migrations ORDER BY version"))]
+
+
+async def test_upgrade_applies_every_migration_once(database):
+    assert [step.version for step in await upgrade(database)] == [step.version for step in MIGRATIONS]
+    assert await upgrade(database) == []
+    assert await pending_migrations(database) == []
+    assert await applied_versions(database) == [step.version for step in MIGRATIONS]
+
+
+async def test_plan_checks_pass_on_seeded_database(database):
+    await upgrade(database)
+    await seed(database, creators=PLAN_CHECK_MIN_ROWS, points=5 * PLAN_CHECK_MIN_ROWS)
+    # Re-running refreshes the planner statistics for the new rows
+    await upgrade(database)
+
+    results = await check_plans(database)
+    failed = [(check.description, plan) for check, outcome, plan in results if outcome != PASS]
+    assert not failed
+
+
+async def test_default_listing_reads_the_ongoing_index(database):
+    await upgrade(database)
+    await seed(database, creators=100, points=5 * PLAN_CHECK_MIN_ROWS)
+    await upgrade(database)
+
+    listing = select(*POINT_COLUMNS).where(status_criterion(models.PointStatus.ONGOING))
+    async with database.connect() as connection:
+        for after_id in (None, 2000):
+            query = paginate(listing, models.DonationPoint.id, 50, after_id)
+            sql = query.compile(database.sync_engine, compile_kwargs={"literal_binds": True})
+            plan = " | ".join(row[-1] for row in await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+            assert "USING INDEX ix_donation_points_ongoing" in plan and "TEMP B-TREE" not in plan, plan
+
+
+async def test_upgrade_over_live_data(database):
+    await upgrade(database, target=1)
+    await seed(database, creators=50, points=PLAN_CHECK_MIN_ROWS)
+
+    applied = await upgrade(database)
+    assert [step.version for step in applied] == list(range(2, LATEST + 1))
+
+    async with database.connect() as connection:
+        indexed = (await connection.execute(text(
+            "SELECT count(*) FROM donation_points_fts WHERE donation_points_fts MATCH 'relief'"
+        ))).scalar()
+        logged = (await connection.execute(text("SELECT count(*) FROM point_changes"))).scalar()
+        mismatched = (await connection.execute(text(
+            "SELECT count(*) FROM donation_points JOIN creators ON creators.id = creator_id "
+            "WHERE creator_verified IS NOT verified"
+        ))).scalar()
+    assert indexed == PLAN_CHECK_MIN_ROWS
+    assert logged == PLAN_CHECK_MIN_ROWS
+    assert mismatched == 0
+
+
+async def test_upgrade_adopts_database_without_history(database):
+    # Databases created before versioned migrations have the schema but no history
+    await upgrade(database)
+    await seed(database, creators=20, points=200)
+    async with database.begin() as connection:
+        await connection.execute(text("DROP TABLE schema_migrations"))
+
+    await upgrade(database)
+
+    assert await applied_versions(database) == [step.version for step in MIGRATIONS]
+    async with database.connect() as connection:
+        assert (await connection.execute(text("SELECT count(*) FROM donation_points"))).scalar() == 200
+        indexed = (await connection.execute(text("SELECT count(*) FROM donation_points_fts"))).scalar()
+    assert indexed == 200
+
+
+async def test_init_db_refuses_outdated_schema(database, monkeypatch):
+    monkeypatch.setattr(migrate, "AUTO_MIGRATE", False)
+    with pytest.raises(RuntimeError, match="migration"):
+        await migrate.init_db(database)
+
+    monkeypatch.setattr(migrate, "AUTO_MIGRATE", True)
+    await migrate.init_db(database)
+    assert await pending_migrations(database) == []
+
+
+def test_concurrent_upgrades(tmp_path):
+    env = {**os.environ, "DATABASE_URL": f"sqlite+aiosqlite:///{tmp_path}/race.sqlite"}
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-m", "app.migrate", "upgrade"],
+            cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+        )
+        for _ in range(6)
+    ]
+    outputs = [worker.communicate(timeout=60) for worker in workers]
+
+    assert [worker.returncode for worker in workers] == [0] * len(workers), [err for _, err in outputs]
+    applied = [line for out, _ in outputs for line in out.splitlines() if line.startswith("applied")]
+    assert len(applied) == len(MIGRATIONS)
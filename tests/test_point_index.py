@@ -0,0 +1,51 @@
+import random
+import pytest
+from app import models
+from app.geo import haversine_distance
+from app.point_index import STATUS_CODES, PointIndex
+
+STATUSES = [models.PointStatus.ONGOING] * 4 + [models.PointStatus.ENDED]
+
+
+def random_index(count: int, seed: int) -> PointIndex:
+    """Points clustered around a few cities, plus some anywhere on Earth"""
+    rng = random.Random(seed)
+    centers = [(21.03, 105.85), (10.78, 106.70), (64.1, -179.9), (-33.9, 18.4)]
+    rows = []
+    for point_id in range(1, count + 1):
+        if rng.random() < 0.8:
+            lat, lng = rng.choice(centers)
+            lat = max(-90.0, min(90.0, rng.gauss(lat, 0.5)))
+            lng = (rng.gauss(lng, 0.5) + 180) % 360 - 180
+        else:
+            lat, lng = rng.uniform(-90, 90), rng.uniform(-180, 180)
+        rows.append((point_id, lat, lng, rng.choice(STATUSES)))
+    index = PointIndex()
+    index.load_rows(rows)
+    return index
+
+
+def brute_force_nearest(index: PointIndex, lat: float, lng: float, k: int, status=None):
+    candidates = [
+        (haversine_distance(lat, lng, float(index.lats[i]), float(index.lngs[i])), int(index.ids[i]))
+        for i in range(len(index))
+        if status is None or index.statuses[i] == STATUS_CODES[status]
+    ]
+    return sorted(candidates)[:k]
+
+
+@pytest.mark.parametrize("lat, lng", [
+    (21.0, 105.8),   # Dense cluster
+    (10.0, 106.0),   # Near a cluster
+    (64.0, 179.9),   # Across the antimeridian from a cluster
+    (-60.0, -40.0),  # Far from everything
+    (89.9, 0.0),     # Near the pole
+])
+@pytest.mark.parametrize("k", [1, 20, 300])
+def test_nearest_matches_brute_force(lat, lng, k):
+    index = random_index(3000, seed=7)
+    for status in (None, models.PointStatus.ONGOING):
+        ids, distances = index.nearest(lat, lng, k, status=status)
+        expected = brute_force_nearest(index, lat, lng, k, status)
+        assert ids.tolist() == [point_id for _, point_id in expected]
+        assert distances.tolist() == pytest.approx([distance for distance, _ in expected], abs=1e-6)
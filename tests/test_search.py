@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models, search
+from app.migrate import upgrade
+from .test_migrate import seed
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_matching_ids_keeps_candidate_order(database):
+    await upgrade(database)
+    await seed(database, creators=5, points=300)
+    candidates = np.array([250, 3, 120, 999_999, 40], dtype=np.int64)
+    async with AsyncSession(database) as db:
+        assert (await search.matching_ids(db, search.points_fts, '"relief"*', candidates)).tolist() == [250, 3, 120, 40]
+        assert (await search.matching_ids(db, search.points_fts, '"nothing"*', candidates)).tolist() == []
+
+
+async def test_ranked_search_has_a_default_limit(database):
+    await upgrade(database)
+    await seed(database, creators=5, points=search.SEARCH_DEFAULT_LIMIT + 50)
+    query = search.ranked(
+        select(models.DonationPoint.id), models.DonationPoint.id, search.points_fts, '"relief"*', None
+    )
+    async with AsyncSession(database) as db:
+        assert len((await db.execute(query)).all()) == search.SEARCH_DEFAULT_LIMIT
+
+
+async def test_ranked_search_filters_before_the_window(database, monkeypatch):
+    await upgrade(database)
+    await seed(database, creators=1, points=60)
+    async with database.begin() as connection:
+        await connection.execute(text("UPDATE donation_points SET creator_verified = id <= 10"))
+    monkeypatch.setattr(search, "SEARCH_RANK_WINDOW", 5)
+
+    def search_where(*criteria):
+        statement = select(models.DonationPoint.id).where(*criteria)
+        return search.ranked(statement, models.DonationPoint.id, search.points_fts, '"relief"*', 100)
+
+    async with AsyncSession(database) as db:
+        # Every newest match is unverified or ongoing; older ones still count
+        verified = (await db.execute(search_where(models.DonationPoint.creator_verified.is_(True)))).all()
+        ended = (await db.execute(search_where(models.DonationPoint.status == models.PointStatus.ENDED))).all()
+    assert len(verified) == 5
+    assert len(ended) == 5
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta, timezone
+import httpx
+import orjson
+import pytest
+from app import models
+from app.database import SessionLocal
+from app.main import app
+from app.migrate import upgrade
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_list_and_detail_write_datetimes_alike():
+    await upgrade()
+    async with SessionLocal() as db:
+        creator = models.Creator(name="Dates", email="dates@example.com", verified=True)
+        db.add(creator)
+        await db.flush()
+        point = models.DonationPoint(
+            creator_id=creator.id, organization_name="Dates", address="Dates", latitude=21.0, longitude=105.8,
+            start_date=datetime(2029, 6, 1, 8, 30, tzinfo=timezone(timedelta(hours=7))),
+            end_date=datetime(2030, 1, 1, 5, 0, tzinfo=timezone.utc),
+        )
+        db.add(point)
+        await db.commit()
+
+    page = {"after_id": point.id - 1, "limit": 1}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        detail = (await client.get(f"/api/donation-points/{point.id}")).json()
+        listed = (await client.get("/api/donation-points", params=page)).json()[0]
+        streamed = orjson.loads((await client.get("/api/donation-points", params={**page, "format": "ndjson"})).text)
+        changes = (await client.get("/api/donation-points/changes")).json()["changes"]
+    changed = next(change["point"] for change in changes if change["id"] == point.id)
+
+    assert detail["end_date"] == "2030-01-01T05:00:00Z"
+    assert detail["start_date"] == "2029-06-01T01:30:00Z"
+    for item in (listed, streamed, changed):
+        assert (item["start_date"], item["end_date"]) == (detail["start_date"], detail["end_date"])
@@ -0,0 +1,19 @@
+import statistics
+from benchmarks.startup import (
+    FIRST_200_BUDGET_MS, IMPORT_BUDGET_MS, eagerly_loaded, environment, first_200_ms, import_time_ms, migrate_ms
+)
+
+RUNS = 3
+
+
+def test_startup_stays_within_budget(tmp_path):
+    env = environment(str(tmp_path / "startup.sqlite"))
+    migrate_ms(env)
+
+    assert statistics.median(import_time_ms(env) for _ in range(RUNS)) <= IMPORT_BUDGET_MS
+    assert statistics.median(first_200_ms(env) for _ in range(RUNS)) <= FIRST_200_BUDGET_MS
+
+
+def test_login_dependencies_load_lazily(tmp_path):
+    # In a fresh interpreter: this test process has imported them already
+    assert eagerly_loaded(environment(str(tmp_path / "startup.sqlite"))) == []
@@ -0,0 +1,99 @@
+import math
+import random
+from collections import Counter
+import pytest
+from app import models
+from app.point_index import PointIndex
+from app.tiles import COUNT, ID_SUM, MAX_CLUSTER_ZOOM, TileIndex, tile_xy
+
+ONGOING, ENDED = models.PointStatus.ONGOING, models.PointStatus.ENDED
+
+
+def random_rows(first_id: int, count: int, rng: random.Random):
+    return [
+        (point_id, rng.gauss(21.0, 1.0), rng.gauss(105.8, 1.0), ONGOING if rng.random() < 0.8 else ENDED)
+        for point_id in range(first_id, first_id + count)
+    ]
+
+
+def assert_same_aggregates(tiles: TileIndex, rebuilt: TileIndex):
+    for zoom in range(MAX_CLUSTER_ZOOM + 1):
+        level, expected = tiles._levels[zoom], rebuilt._levels[zoom]
+        assert level.keys() == expected.keys(), zoom
+        for cell, agg in expected.items():
+            assert level[cell][COUNT] == agg[COUNT] and level[cell][ID_SUM] == agg[ID_SUM]
+            assert level[cell] == pytest.approx(agg)
+
+
+def test_incremental_tiles_match_a_rebuild():
+    rng = random.Random(3)
+    index = PointIndex()
+    tiles = TileIndex(index)
+    index.load_rows(random_rows(1, 2000, rng))
+
+    # Render tiles first, so stale cache entries would show up below
+    sample = [(zoom, *map(int, tile_xy(21.0, 105.8, zoom))) for zoom in (0, 5, 9, MAX_CLUSTER_ZOOM)]
+    for tile in sample:
+        tiles.clusters(*tile)
+
+    # Create
+    index.upsert_many(random_rows(5000, 50, rng))
+    # Patch: move some points, end others, reopen a few
+    moved = [(point_id, lat + 0.3, lng - 0.2, status) for point_id, lat, lng, status in random_rows(10, 30, rng)]
+    index.upsert_many(moved)
+    index.upsert_many([(point_id, 21.0, 105.8, ENDED) for point_id in range(100, 140)])
+    index.upsert_many([(point_id, 21.0, 105.8, ONGOING) for point_id in range(130, 135)])
+    # Delete
+    index.remove_many(list(range(500, 560)) + [5010, 999_999])
+
+    rebuilt = TileIndex(index)
+    rebuilt._rebuild()
+    assert_same_aggregates(tiles, rebuilt)
+    for tile in sample:
+        clusters = sorted(tiles.clusters(*tile)["clusters"], key=lambda cluster: cluster["bounds"])
+        expected = sorted(rebuilt.clusters(*tile)["clusters"], key=lambda cluster: cluster["bounds"])
+        assert [cluster["count"] for cluster in clusters] == [cluster["count"] for cluster in expected]
+        for cluster, want in zip(clusters, expected):
+            assert (cluster["latitude"], cluster["longitude"]) == pytest.approx((want["latitude"], want["longitude"]))
+
+
+def cell_at(lat: float, lng: float, zoom: int):
+    """Slippy-map tile of a point, computed independently of app.tiles"""
+    scale = 2 ** zoom
+    lat = max(-85.05112878, min(85.05112878, lat))
+    x = int((lng + 180.0) / 360.0 * scale)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * scale)
+    return min(x, scale - 1), min(y, scale - 1)
+
+
+def brute_force_density(rows, resolution: int, bbox):
+    min_lat, max_lat, min_lng, max_lng = bbox
+    (x0, y0), (x1, y1) = cell_at(max_lat, min_lng, resolution), cell_at(min_lat, max_lng, resolution)
+    counts = Counter()
+    for _, lat, lng, status in rows:
+        x, y = cell_at(lat, lng, resolution)
+        in_x = x0 <= x <= x1 if min_lng <= max_lng else x >= x0 or x <= x1
+        if status == ONGOING and in_x and y0 <= y <= y1:
+            counts[(x, y)] += 1
+    return dict(counts)
+
+
+@pytest.mark.parametrize("resolution, bbox", [
+    (12, (20.8, 21.2, 105.6, 106.0)),     # City: probes the bbox's cells
+    (6, (15.0, 27.0, 100.0, 112.0)),      # Region: filters the occupied cells
+    (3, (-85.0, 85.0, -180.0, 180.0)),    # World
+    (9, (60.0, 70.0, 175.0, -175.0)),     # Across the antimeridian
+])
+def test_density_matches_brute_force(resolution, bbox):
+    rng = random.Random(11)
+    rows = random_rows(1, 3000, rng) + [
+        (point_id, rng.uniform(60, 70), rng.choice([rng.uniform(170, 180), rng.uniform(-180, -170)]), ONGOING)
+        for point_id in range(10_000, 10_300)
+    ]
+    index = PointIndex()
+    tiles = TileIndex(index)
+    index.load_rows(rows)
+
+    cells = tiles.density(resolution, bbox)
+    assert cells
+    assert {(cell["x"], cell["y"]): cell["count"] for cell in cells} == brute_force_density(rows, resolution, bbox)
@@ -0,0 +1,69 @@
+import httpx
+import pytest
+from app import auth, bulk, models
+from app.database import SessionLocal
+from app.main import app
+from app.migrate import upgrade
+
+pytestmark = pytest.mark.anyio
+
+# A spot no other test puts points near
+CAPE_TOWN = {"lat": -33.92, "lng": 18.42, "radius": 5}
+
+
+async def add_creator(email: str, verified: bool) -> int:
+    async with SessionLocal() as db:
+        creator = models.Creator(name=email, email=email, verified=verified)
+        db.add(creator)
+        await db.commit()
+        return creator.id
+
+
+def client():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def bearer(creator_id: int) -> dict:
+    return {"Authorization": f"Bearer {auth.create_access_token({'sub': str(creator_id)})}"}
+
+
+async def test_inserts_take_the_creator_flag():
+    await upgrade()
+    verified = await add_creator("verified-insert@example.com", True)
+    unverified = await add_creator("unverified-insert@example.com", False)
+    form = {"organization_name": "Flag", "address": "Flag", "latitude": "-33.92", "longitude": "18.42"}
+
+    async with client() as http:
+        for creator_id, expected in ((verified, True), (unverified, False)):
+            response = await http.post("/api/donation-points", data=form, headers=bearer(creator_id))
+            assert response.status_code == 201
+            assert response.json()["creator_verified"] is expected
+
+    rows, _ = bulk.validate_rows([{"organization_name": "Bulk flag", "address": "Flag", "latitude": -33.92, "longitude": 18.42}])
+    async with SessionLocal() as db:
+        ids, errors = await bulk.insert_points(db, verified, rows)
+        assert not errors
+        assert (await db.get(models.DonationPoint, ids[0])).creator_verified is True
+
+
+async def test_verified_filter_follows_verification():
+    await upgrade()
+    admin = await add_creator("admin-flag@example.com", True)
+    creator = await add_creator("flipped@example.com", False)
+    form = {"organization_name": "Flipped", "address": "Flipped", "latitude": "-33.93", "longitude": "18.43"}
+
+    async with client() as http:
+        point_id = (await http.post("/api/donation-points", data=form, headers=bearer(creator))).json()["id"]
+
+        async def listed(creator_verified: bool) -> bool:
+            params = {**CAPE_TOWN, "creator_verified": str(creator_verified).lower()}
+            points = (await http.get("/api/donation-points", params=params)).json()
+            return point_id in [point["id"] for point in points]
+
+        assert not await listed(True) and await listed(False)
+
+        await http.post(f"/api/admin/creators/{creator}/verify", headers=bearer(admin))
+        assert await listed(True) and not await listed(False)
+
+        await http.post(f"/api/admin/creators/{creator}/unverify", headers=bearer(admin))
+        assert not await listed(True) and await listed(False)